@@ -1,23 +1,130 @@
 import streamlit as st
 import os
-import tempfile
+import hashlib
 import shutil
 from excel import Excel
-import json
-import pandas as pd
-from google_sheets import GoogleSheetsService
+from cache import ResultCache
+from day_work import DAYS_FILE, DayWork
+from jobs import JobQueue
+from history import HistoryStore
+from readers import read_metadata
 
-# Create necessary directories
-os.makedirs("excel", exist_ok=True)
+@st.cache_resource
+def get_result_cache():
+    """One result cache per server process, shared by every session"""
+    return ResultCache(max_entries=32)
+
+@st.cache_resource
+def get_job_queue():
+    """Background workers shared by every session, so reruns never wait on processing or uploads"""
+    return JobQueue(max_workers=2)
+
+@st.cache_resource
+def get_history_store():
+    """Snapshots of every processed file, for day-over-day comparisons"""
+    return HistoryStore()
+
+def process_upload(job, data, digest, jour_rest, cache, history=None, source=""):
+    """
+    Background job: run get_day_work and fix_sheet on the uploaded bytes, parsed
+    in place (no temporary file), and record today's snapshot of source (the
+    uploaded file name, so each region keeps its own) in history.
+    return the processor, the rest days used and the day work message
+    """
+    # Initialize Excel processor, reusing earlier results for the same file content
+    excel_processor = Excel(
+        data,
+        rest_days=jour_rest,
+        read_only=True,
+        cache=cache,
+        digest=digest,
+        # Results stay in this session's memory, nothing shared on disk
+        output_path=None,
+        progress=job.report,
+    )
+
+    # Extract day work information
+    try:
+        total_days, work_days = excel_processor.get_day_work()
+        message = ("success", f"✅ File processed successfully!. Day work extracted: {total_days} Total Days, {work_days} Work Days")
+    except Exception as e:
+        message = ("warning", f"Could not extract day work information: {str(e)}")
+
+    # Process with jour_rest parameter
+    if not excel_processor.fix_sheet(jour_rest=jour_rest):
+        raise Exception("Failed to process the Excel file.")
+    # Later RAF recomputes run in the script thread, not in this job
+    excel_processor.progress = None
+
+    if history is not None:
+        job.report(90, "Recording the snapshot in history...")
+        try:
+            history.record(
+                {"AGADIR": excel_processor.agadir, "QUALI NV": excel_processor.quali_nv},
+                source=source,
+                worked_days=excel_processor.days.worked if excel_processor.days else None,
+                rest_days=jour_rest,
+            )
+        except Exception as e:
+            # History is a bonus, the processed file is still good
+            print(f"Could not record history: {e}")
+    return {"processor": excel_processor, "jour_rest": jour_rest, "message": message}
+
+def publish_tables(job, gs_service, tables):
+    """Background job: push the processed tables to every routed spreadsheet"""
+    job.report(5, "Uploading to Google Sheets...")
+    return gs_service.publish_to_google_sheets(tables, progress=job.report)
+
+def take_finished_job(key):
+    """
+    return the finished job whose id is in st.session_state[key] and forget it,
+    or None while it is still running
+    """
+    job_id = st.session_state.get(key)
+    if job_id is None:
+        return None
+    job = get_job_queue().get(job_id)
+    if job is None:
+        # Forgotten by the queue (e.g. the server restarted)
+        del st.session_state[key]
+        return None
+    if not job.done:
+        return None
+    del st.session_state[key]
+    get_job_queue().forget(job_id)
+    return job
+
+@st.fragment(run_every=0.5)
+def show_job_progress(key):
+    """Real stage progress of the job in st.session_state[key], refreshed on its own"""
+    job = get_job_queue().get(st.session_state.get(key))
+    if job is None:
+        return
+    if job.done:
+        # Rerun the whole page so the result gets picked up
+        st.rerun()
+    st.progress(job.progress, text=job.stage)
+
+def upload_day_work(data, digest):
+    """
+    Day work of the uploaded file from AGADIR!C6 alone, probed once per file in
+    milliseconds so the rest days default is right before processing.
+    return the DayWork, or None when the cell can't be read
+    """
+    if st.session_state.get('probed_digest') != digest:
+        try:
+            metadata = read_metadata(data, "AGADIR", ("C6",))
+            st.session_state.probed_days = DayWork.from_cell(metadata["cells"]["C6"])
+        except Exception as e:
+            print(f"Could not read the day work of the upload: {e}")
+            st.session_state.probed_days = None
+        st.session_state.probed_digest = digest
+    return st.session_state.probed_days
 
 def create_days_json():
     """Create days.json file if it doesn't exist"""
-    if not os.path.exists("days.json"):
-        default_data = {
-            "from_file": {"t": "24", "d": "4"}
-        }
-        with open("days.json", "w") as f:
-            json.dump(default_data, f)
+    if not os.path.exists(DAYS_FILE):
+        DayWork(4, 24).save()
 
 def main():
     st.set_page_config(
@@ -41,8 +148,6 @@ def excel_converter_section():
     # Initialize session state for processed data
     if 'processed_data' not in st.session_state:
         st.session_state.processed_data = None
-    if 'output_path' not in st.session_state:
-        st.session_state.output_path = None
     if 'excel_processor' not in st.session_state:
         st.session_state.excel_processor = None
     
@@ -61,14 +166,14 @@ def excel_converter_section():
         
         
         
-        # Initialize total_day_work with default value from days.json or fallback
-        try:
-            with open('days.json', 'r') as f:
-                days_data = json.load(f)
-                d_value = days_data.get('from_file', {}).get('d', 4)
-                total_day_work = int(d_value) if isinstance(d_value, (str, int, float)) else 4
-        except (FileNotFoundError, KeyError, ValueError, TypeError):
-            total_day_work = 4  # fallback default
+        data = uploaded_file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+
+        # Initialize total_day_work from the uploaded file's C6, else from this
+        # session's last processed file, else from the days.json default or fallback
+        days = (upload_day_work(data, digest) or st.session_state.get('days')
+                or DayWork.load(default=DayWork(4, 24)))
+        total_day_work = days.worked
             
         # Calculate default rest days
         day_rest = 24 - total_day_work
@@ -79,88 +184,60 @@ def excel_converter_section():
         # Debug: Show the jour_rest value being used
        
         
-        # Process button
+        # Process button: the work runs as a background job, this run only submits it
         if st.button("Process Excel File", type="primary"):
-            temp_path = None
+            st.session_state.process_job = get_job_queue().submit(
+                f"process {uploaded_file.name}",
+                process_upload,
+                data,
+                digest,
+                jour_rest,
+                get_result_cache(),
+                get_history_store(),
+                # Same source naming as batch.py, so both record one snapshot per region file
+                os.path.splitext(uploaded_file.name)[0],
+            )
+
+        job = take_finished_job('process_job')
+        if job is not None:
+            if job.status == "failed":
+                st.error(f"An error occurred: {job.error}")
+            elif job.result["processor"].agadir is not None:
+                excel_processor = job.result["processor"]
+                level, message = job.result["message"]
+                getattr(st, level)(message)
+
+                # Processed tables are already in memory, no need to re-read the file
+                # Store processed data in session state
+                st.session_state.processed_data = excel_processor.agadir
+                st.session_state.excel_processor = excel_processor
+                st.session_state.processed_rest_days = job.result["jour_rest"]
+                st.session_state.days = excel_processor.days
+
+                # Get QUALI NV data
+                df_quali = excel_processor.get_quali_nv_dataframe()
+                if df_quali is not None:
+                    st.session_state.quali_nv_data = df_quali
+            else:
+                st.error("Output file was not created. Please check the logs.")
+
+        elif st.session_state.get('process_job'):
+            show_job_progress('process_job')
+        
+        # Only the rest days changed since processing: recompute the RAF columns
+        # from the base tables the processor kept, without touching the file again
+        # (fast enough to stay in the script run)
+        elif (st.session_state.excel_processor is not None
+              and st.session_state.excel_processor.digest == digest
+              and st.session_state.get('processed_rest_days') != jour_rest):
             try:
-                # Create a temporary file to save the uploaded file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    temp_path = tmp_file.name
-                
-                # Initialize Excel processor
-                excel_processor = Excel(temp_path, rest_days=jour_rest)
-                
-                # Progress bar
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                # Extract day work information
-                status_text.text("Extracting day work information...")
-                progress_bar.progress(25)
-                
-                try:
-                    total_days, work_days = excel_processor.get_day_work()
-                    st.success(f"✅ File processed successfully!. Day work extracted: {total_days} Total Days, {work_days} Work Days")
-                except Exception as e:
-                    st.warning(f"Could not extract day work information: {str(e)}")
-                
-                # Fix and process the sheet
-                status_text.text("Processing Excel sheets...")
-                progress_bar.progress(50)
-                
-                # Process with jour_rest parameter
-                success = excel_processor.fix_sheet(jour_rest=jour_rest)
-                progress_bar.progress(75)
-                
-                if success:
-                    status_text.text("Processing completed successfully!")
-                    progress_bar.progress(100)
-                    
-                    # Determine output filename
-                    output_filename = "finale_jour.xlsx"
-                    output_path = f"excel/{output_filename}"
-                    
-                    if os.path.exists(output_path):
-                        
-                        # Read the processed file into a dataframe for display
-                        df = pd.read_excel(output_path)
-                        
-                        # Store processed data in session state
-                        st.session_state.processed_data = df
-                        st.session_state.output_path = output_path
-                        st.session_state.excel_processor = excel_processor
-                        
-                        # Get QUALI NV data
-                        df_quali = excel_processor.get_quali_nv_dataframe()
-                        if df_quali is not None:
-                            st.session_state.quali_nv_data = df_quali
-                        
-                       
-                       
-                        
-                        
-                        
-                        
-                        
-                        # Add button to send data to Google Sheets
-                        
-                        
-                        
-                    else:
-                        st.error("Output file was not created. Please check the logs.")
-                else:
-                    st.error("Failed to process the Excel file.")
-                    
+                excel_processor = st.session_state.excel_processor
+                excel_processor.fix_sheet(jour_rest=jour_rest)
+                st.session_state.processed_data = excel_processor.agadir
+                st.session_state.quali_nv_data = excel_processor.get_quali_nv_dataframe()
+                st.session_state.processed_rest_days = jour_rest
             except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-            finally:
-                # Clean up temporary file
-                if temp_path and os.path.exists(temp_path):
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
+                st.warning(f"Could not update RAF for the new rest days, please process the file again: {str(e)}")
     
     # Display processed data if it exists in session state
     if st.session_state.processed_data is not None:
@@ -173,6 +250,13 @@ def excel_converter_section():
             st.dataframe(st.session_state.quali_nv_data)
             st.info(f"QUALI NV sheet contains {len(st.session_state.quali_nv_data)} rows with sales performance metrics")
         
+        # Day-over-day changes, served from the history store
+        history = get_history_store()
+        if len(history.dates()) > 1:
+            with st.expander("📅 Changes since the previous snapshot"):
+                metric = st.selectbox("Figure", ["REAL", "RAF", "EnCours", "OBJ MOIS", "Percent"], key="history_metric")
+                st.dataframe(history.deltas(metric))
+        
         # Add button to send data to Google Sheets
         st.subheader("Send to Google Sheets")
         
@@ -180,50 +264,54 @@ def excel_converter_section():
         
         # Combined upload button for both AGADIR and QUALI NV data
         if st.button("🚀 Send All Data to Google Sheets", type="primary", key="upload_all_data"):
-            with st.spinner("Uploading all data to Google Sheets..."):
-                try:
-                    gs_service = GoogleSheetsService()
-                    agadir_success = False
-                    quali_success = False
-                    uploaded_sheets = []
-                    
-                    # Upload AGADIR data
-                    agadir_result = gs_service.upload_excel_to_google_sheets()
-                    if agadir_result:
-                        agadir_success = True
-                        uploaded_sheets.append("AGADIR → 'Suivi Test' worksheet")
-                    
-                    # Upload QUALI NV data if available
-                    if hasattr(st.session_state, 'quali_nv_data') and st.session_state.quali_nv_data is not None:
-                        quali_result = gs_service.upload_quali_nv_to_google_sheets()
-                        if quali_result:
-                            quali_success = True
-                            uploaded_sheets.append("QUALI NV → 'QUALI NV' worksheet")
-                    
-                    # Single informative message
-                    if agadir_success and (quali_success or not hasattr(st.session_state, 'quali_nv_data')):
-                        sheets_info = " | ".join(uploaded_sheets)
-                        st.success(f"🎉 Successfully uploaded all data to Google Sheets: {sheets_info}")
-                    elif agadir_success or quali_success:
-                        sheets_info = " | ".join(uploaded_sheets)
-                        st.warning(f"⚠️ Partially uploaded: {sheets_info}. Some data failed to upload.")
-                    else:
-                        st.error("❌ Failed to upload data to Google Sheets. Ensure Streamlit secrets are configured (google_service_account) in Streamlit Cloud settings.")
-                        
-                except Exception as e:
-                    st.error(f"❌ Google Sheets upload failed: {str(e)}")
+            # gspread and google.auth only load once someone publishes
+            from google_sheets import GoogleSheetsService
+            gs_service = GoogleSheetsService()
+            # Authenticate in the script thread so errors show up on the page
+            if gs_service.authenticate_from_secrets():
+                tables = {"AGADIR": st.session_state.processed_data}
+                if hasattr(st.session_state, 'quali_nv_data') and st.session_state.quali_nv_data is not None:
+                    tables["QUALI NV"] = st.session_state.quali_nv_data
+                st.session_state.upload_job = get_job_queue().submit("publish", publish_tables, gs_service, tables)
+            else:
+                st.error("❌ Failed to upload data to Google Sheets. Ensure Streamlit secrets are configured (google_service_account) in Streamlit Cloud settings.")
+
+        job = take_finished_job('upload_job')
+        if job is not None:
+            results = job.result or {}
+            uploaded_sheets = [
+                f"{', '.join(result['worksheets'])} → {spreadsheet_id[:8]}… ({result['seconds']}s)"
+                for spreadsheet_id, result in results.items() if result["url"]
+            ]
+            failed_sheets = [
+                f"{', '.join(result['worksheets'])} → {spreadsheet_id[:8]}…"
+                for spreadsheet_id, result in results.items() if not result["url"]
+            ]
+
+            # Single informative message
+            if job.status == "failed":
+                st.error(f"❌ Google Sheets upload failed: {job.error}")
+            elif uploaded_sheets and not failed_sheets:
+                sheets_info = " | ".join(uploaded_sheets)
+                st.success(f"🎉 Successfully uploaded all data to Google Sheets: {sheets_info}")
+            elif uploaded_sheets:
+                st.warning(f"⚠️ Partially uploaded: {' | '.join(uploaded_sheets)}. Failed: {' | '.join(failed_sheets)}")
+            else:
+                st.error("❌ Failed to upload data to Google Sheets. Ensure Streamlit secrets are configured (google_service_account) in Streamlit Cloud settings.")
+        elif st.session_state.get('upload_job'):
+            show_job_progress('upload_job')
         
-        # Provide download button
-        if st.session_state.output_path and os.path.exists(st.session_state.output_path):
+        # Provide download button, the XLSX is exported once per result and kept on the processor
+        if st.session_state.excel_processor is not None:
+            excel_processor = st.session_state.excel_processor
             st.subheader("Download File")
-            with open(st.session_state.output_path, "rb") as f:
-                st.download_button(
-                    label="📥 Download Processed Excel File",
-                    data=f,
-                    file_name="finale_jour.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key="persistent_download"
-                )
+            st.download_button(
+                label="📥 Download Processed Excel File",
+                data=excel_processor.output,
+                file_name="finale_jour.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key="persistent_download"
+            )
 
 if __name__ == "__main__":
     main()
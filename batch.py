@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Process many regional workbooks at once, one worker process per file.
+
+    python batch.py exports/ other/file.xlsx --output-dir excel/batch --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from excel import Excel
+from history import HistoryStore
+from readers import DEFAULT_ENGINE, ENGINES
+
+
+def collect_workbooks(paths) -> list:
+    """
+    Expand directories into the .xlsx files they contain, skipping Excel lock files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(".xlsx") and not name.startswith("~$"):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+
+def output_names(files) -> dict:
+    """
+    Name of each file's outputs: its path relative to the directory the files
+    share, without extension. Files of one directory keep their plain names,
+    files with the same name in different directories don't overwrite each other
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    return {path: os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in files}
+
+
+def process_file(path, output_dir, jour_rest=None, history_path=None, engine=None, name=None) -> dict:
+    """
+    Run get_day_work and fix_sheet on one workbook and return its summary row.
+    Outputs go to output_dir/<name>_finale_jour.xlsx, name being the file name
+    without extension by default (see output_names). With history_path the
+    tables are also recorded as today's snapshot of the file, under name.
+    engine picks the reader (see readers.py). Errors are reported in the row
+    instead of raised, so one bad file does not stop the batch.
+    """
+    start = time.perf_counter()
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    row = {"file": path, "status": "ok", "error": None, "output": None, "tables": None,
+           "work_days": None, "rest_days": jour_rest, "agadir_rows": None, "quali_rows": None}
+    try:
+        output_path = os.path.join(output_dir, f"{name}_finale_jour.xlsx")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        processor = Excel(path, read_only=True, output_path=output_path, engine=engine)
+        work_days, _ = processor.get_day_work()
+        if jour_rest is None:
+            # Same default as the app's rest days input
+            jour_rest = 24 - work_days
+        processor.fix_sheet(jour_rest=jour_rest)
+        if history_path:
+            HistoryStore(history_path).record(
+                {"AGADIR": processor.agadir, "QUALI NV": processor.quali_nv},
+                source=name, worked_days=work_days, rest_days=jour_rest,
+            )
+        row.update(output=output_path, tables=processor.tables_path, work_days=work_days, rest_days=jour_rest,
+                   agadir_rows=len(processor.agadir), quali_rows=len(processor.quali_nv))
+    except Exception as e:
+        row.update(status="failed", error=f"{type(e).__name__}: {e}")
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def process_batch(paths, output_dir="excel/batch", jour_rest=None, workers=None, history_path=None,
+                  engine=None) -> pd.DataFrame:
+    """
+    Process every workbook in paths across a process pool (openpyxl work is
+    CPU bound, so threads would not help) and return the summary table
+    """
+    files = collect_workbooks(paths)
+    names = output_names(files)
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, path, output_dir, jour_rest, history_path, engine, names[path]): path
+                   for path in files}
+        for future in as_completed(futures):
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                rows.append({"file": futures[future], "status": "failed",
+                             "error": f"{type(e).__name__}: {e}"})
+    summary = pd.DataFrame(rows)
+    if not summary.empty:
+        summary = summary.sort_values("file").reset_index(drop=True).convert_dtypes()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process AGADIR/QUALI NV workbooks in batch")
+    parser.add_argument("paths", nargs="+", help="Workbooks or directories of workbooks")
+    parser.add_argument("--output-dir", default="excel/batch", help="Where processed files and summary.csv go")
+    parser.add_argument("--rest-days", type=int, default=None,
+                        help="Rest days for every file (default: 24 - work days of each file)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--history", default=None, metavar="PATH",
+                        help="Record every file as today's snapshot in this SQLite history (e.g. excel/history.sqlite)")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Reader of the source workbooks (see benchmark.py --engines)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = process_batch(args.paths, args.output_dir, args.rest_days, args.workers, args.history,
+                            args.engine)
+    summary_path = os.path.join(args.output_dir, "summary.csv")
+    summary.to_csv(summary_path, index=False)
+
+    print(summary.to_string(index=False))
+    failed = int((summary["status"] != "ok").sum()) if not summary.empty else 0
+    print(f"✅ {len(summary) - failed} processed, {failed} failed in {time.perf_counter() - start:.1f}s")
+    print(f"📊 Summary written to {summary_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
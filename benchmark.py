@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Excel pipeline stage by stage on synthetic AGADIR/QUALI NV workbooks.
+
+    python benchmark.py --sizes 21,300,1500 --output bench.json
+    python benchmark.py --sizes 21,300,1500 --baseline bench.json   # exit 1 on a slowdown
+    python benchmark.py --sizes 300 --engines openpyxl,xml,calamine  # compare source readers
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+from calculations import spread_over_rest_days
+from excel import Excel, table_to_dataframe
+from exporter import export_tables
+from layout import AGADIR_LAYOUT, LAYOUTS
+from readers import DEFAULT_ENGINE, available_engines
+
+
+FAMILIES = ["LEVURE", "MGM", "BOUILLON", "CONDIMENTS", "SAUCES TACOS", "CONSERVES", "MISWAK", "C.A (ht)"]
+
+
+def _figure(rng, low, high):
+    # Mostly numbers, with the empty and "%" cells real exports have
+    draw = rng.random()
+    if draw < 0.05:
+        return None
+    if draw < 0.08:
+        return "%"
+    if draw < 0.5:
+        return rng.randint(low, high)
+    return rng.uniform(low, high)
+
+
+def _agadir_rows(count):
+    """Source rows holding count AGADIR data rows, filling the layout ranges in order"""
+    rows = []
+    for first, last in AGADIR_LAYOUT.data_rows:
+        size = count - len(rows) if last is None else min(count - len(rows), last - first + 1)
+        rows += range(first, first + size)
+    return rows
+
+
+def make_workbook(path, vendors=21, quali_rows=None, extra_sheets=2, seed=1):
+    """
+    Write a synthetic source workbook laid out like the real export: the C6
+    day-work cell, the merged header ranges, 8 family rows per vendor in the
+    AGADIR data ranges (with subtotal rows between them), a QUALI NV sheet of
+    quali_rows reps (default one per vendor) and a few unrelated sheets
+    """
+    rng = random.Random(seed)
+    wb = Workbook()
+    agadir = wb.active
+    agadir.title = "AGADIR"
+    agadir["C6"] = "8/ 24 jours"
+    for column in range(1, 21):
+        agadir.cell(8, column, f"G{column}")
+        agadir.cell(9, column, f"H{column}")
+    for cells in ["A8:A9", "B8:B9", "D8:D9", "F8:J8", "K8:O8"]:
+        agadir.merge_cells(cells)
+    for row in range(10, 42):
+        agadir.cell(row, 3, "junk")
+        agadir.cell(row, 6, rng.randint(0, 99))
+    for row in range(194, 202):
+        agadir.cell(row, 3, "TOTAL")
+        agadir.cell(row, 6, 1)
+    for row in range(218, 232):
+        agadir.cell(row, 3, "TOTAL2")
+        agadir.cell(row, 6, 2)
+    for number, row in enumerate(_agadir_rows(vendors * len(FAMILIES))):
+        vendor, family = divmod(number, len(FAMILIES))
+        agadir.cell(row, 1, "AGADIR")
+        agadir.cell(row, 2, "SEC")
+        agadir.cell(row, 3, f"V{vendor:02d} VENDOR")
+        agadir.cell(row, 4, FAMILIES[family])
+        agadir.cell(row, 5, "x")
+        for column, (low, high) in {6: (0, 50000), 7: (0, 60000), 8: (0, 200), 11: (0, 10 ** 6),
+                                    14: (0, 10 ** 6), 17: (0, 5000)}.items():
+            agadir.cell(row, column, _figure(rng, low, high))
+        agadir.cell(row, 15, rng.choice([0.1, -0.5, "%", 2.32]))
+        agadir.cell(row, 19, rng.choice(["%", 5, None]))
+        agadir.cell(row, 20, rng.choice(["%", 7.5, None]))
+        for column in (9, 10, 12, 13, 16, 18):
+            agadir.cell(row, column, rng.randint(0, 9))
+
+    quali = wb.create_sheet("QUALI NV")
+    quali["E1"] = "TITLE"
+    quali.merge_cells("E1:K2")
+    headers = {4: "REP", 8: "CLT PROGRAMME", 12: "ACM", 24: "Moy L/BL", 25: "Obj L/BL", 26: "%", 29: "TSM"}
+    for column, header in headers.items():
+        quali.cell(8, column, header)
+    for row in range(9, 13):
+        quali.cell(row, 4, "junk")
+    row = 13
+    for number in range(vendors if quali_rows is None else quali_rows):
+        if row == 21:
+            # The subtotal row the QUALI NV layout skips
+            quali.cell(row, 4, "VIDE TOTAL")
+            row += 1
+        quali.cell(row, 4, f"Q{number:02d} REP" if number % 11 else None)
+        quali.cell(row, 8, _figure(rng, 0, 900))
+        quali.cell(row, 12, rng.random())
+        quali.cell(row, 24, rng.uniform(3, 8))
+        quali.cell(row, 25, rng.uniform(4, 7))
+        quali.cell(row, 26, rng.random() * 2)
+        quali.cell(row, 29, rng.choice([rng.random(), None, "%"]))
+        for column in range(1, 31):
+            if column not in headers and quali.cell(row, column).value is None:
+                quali.cell(row, column, rng.randint(0, 5))
+        row += 1
+    quali.cell(row, 4, "TOTAL")
+    quali.cell(row, 8, 9999)
+    quali.cell(row + 1, 4, "FOOT")
+
+    for number in range(extra_sheets):
+        extra = wb.create_sheet(f"EXTRA{number}")
+        for extra_row in range(1, 200):
+            for column in range(1, 25):
+                extra.cell(extra_row, column, rng.random())
+    wb.save(path)
+    return path
+
+
+def stages(path, jour_rest, read_only=True, engine=None):
+    """
+    return [(stage, callable)] running the pipeline one stage at a time, each
+    stage taking its input from the previous one, in the order fix_sheet runs
+    them, followed by what the consumers of the output do
+    """
+    state = {}
+    processor = Excel(path, read_only=read_only, output_path=None, engine=engine)
+
+    def load():
+        state["source"] = processor.load()
+
+    def day_work():
+        state["worked"], _ = processor.get_day_work()
+
+    def reshape():
+        state["tables"] = processor._reshape(state["source"])
+
+    def compute():
+        base = processor._base_stage(state["tables"], state["worked"])
+        state["processed"] = {
+            name: [header] + spread_over_rest_days(table, remaining, jour_rest).values.tolist()
+            for name, (header, table, remaining) in base.items()
+        }
+        state["frames"] = {name: table_to_dataframe(rows) for name, rows in state["processed"].items()}
+
+    def save():
+        processed = [(layout, state["processed"][layout.name]) for layout in LAYOUTS]
+        state["output"] = export_tables(processed, workbook=None if read_only else state["source"])
+        processor.close()
+
+    def read_output():
+        pd.read_excel(io.BytesIO(state["output"]), sheet_name=None)
+
+    def upload_payload():
+        # Imported here so the other stages don't load gspread and Streamlit
+        from google_sheets import GoogleSheetsService, chunk_requests
+        service = GoogleSheetsService()
+        blocks = [(name, 1, 1, service.dataframe_to_grid(frame)) for name, frame in state["frames"].items()]
+        json.dumps(chunk_requests(blocks), default=str)
+
+    return [("load", load), ("day_work", day_work), ("reshape", reshape), ("compute", compute),
+            ("save", save), ("read_output", read_output), ("upload_payload", upload_payload)]
+
+
+def end_to_end(path, jour_rest, read_only=True, engine=None):
+    """get_day_work + fix_sheet + the XLSX export, as the app runs them"""
+    processor = Excel(path, read_only=read_only, output_path=None, engine=engine)
+    processor.get_day_work()
+    processor.fix_sheet(jour_rest=jour_rest)
+    return processor.output
+
+
+def _processed_rows(path, jour_rest, engine):
+    processor = Excel(path, read_only=True, output_path=None, engine=engine)
+    processor.get_day_work()
+    processor.fix_sheet(jour_rest=jour_rest)
+    return [rows for _, rows in processor._processed]
+
+
+def same_results(path, jour_rest=16, engine=DEFAULT_ENGINE) -> bool:
+    """True when engine gives exactly the processed tables openpyxl gives, value and type"""
+    expected = [row for rows in _processed_rows(path, jour_rest, "openpyxl") for row in rows]
+    actual = [row for rows in _processed_rows(path, jour_rest, engine) for row in rows]
+
+    def same(first, second):
+        # NaN never equals itself
+        return type(first) is type(second) and (first == second or (first != first and second != second))
+
+    return len(expected) == len(actual) and all(
+        len(first) == len(second) and all(map(same, first, second)) for first, second in zip(expected, actual)
+    )
+
+
+def _measure(func, trace):
+    gc.collect()
+    if trace:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - before if trace else None
+    return seconds, peak
+
+
+def benchmark_file(path, jour_rest=16, repeat=3, read_only=True, engine=None) -> list:
+    """
+    Time every stage repeat times (keeping the fastest run) and measure its
+    peak memory in one more run under tracemalloc, which slows code down too
+    much to time it. return one result row per stage
+    """
+    times = {}
+    peaks = {}
+    for run in range(repeat + 1):
+        trace = run == repeat
+        if trace:
+            tracemalloc.start()
+        try:
+            steps = stages(path, jour_rest, read_only, engine) + [
+                ("fix_sheet", lambda: end_to_end(path, jour_rest, read_only, engine))]
+            for stage, func in steps:
+                seconds, peak = _measure(func, trace)
+                if trace:
+                    peaks[stage] = peak
+                else:
+                    times[stage] = min(times.get(stage, seconds), seconds)
+        finally:
+            if trace:
+                tracemalloc.stop()
+    return [{"stage": stage, "seconds": round(times[stage], 4), "peak_mb": round(peaks[stage] / 1e6, 2)}
+            for stage in times]
+
+
+def run(sizes, workdir, jour_rest=16, repeat=3, read_only=True, engines=None) -> pd.DataFrame:
+    """
+    Benchmark a generated workbook per size (vendors) with each engine, reusing
+    workbooks already in workdir. identical tells whether the engine gave the
+    same processed tables as openpyxl
+    """
+    rows = []
+    os.makedirs(workdir, exist_ok=True)
+    for vendors in sizes:
+        path = os.path.join(workdir, f"bench_{vendors}.xlsx")
+        if not os.path.exists(path):
+            print(f"🛠️ Generating {path} with {vendors} vendors")
+            make_workbook(path, vendors)
+        for engine in engines or [DEFAULT_ENGINE]:
+            identical = same_results(path, jour_rest, engine)
+            for row in benchmark_file(path, jour_rest, repeat, read_only, engine):
+                rows.append({"vendors": vendors, "agadir_rows": vendors * len(FAMILIES), "engine": engine,
+                             "identical": identical, **row})
+    return pd.DataFrame(rows)
+
+
+def regressions(results, baseline, tolerance=0.25, noise=0.05) -> pd.DataFrame:
+    """
+    return the stages at least tolerance slower than in baseline (and by more
+    than noise seconds, so tiny stages don't flap)
+    """
+    keys = ["vendors", "stage"] + (["engine"] if "engine" in results and "engine" in baseline else [])
+    merged = results.merge(baseline, on=keys, suffixes=("", "_baseline"))
+    slower = merged[(merged["seconds"] > merged["seconds_baseline"] * (1 + tolerance))
+                    & (merged["seconds"] - merged["seconds_baseline"] > noise)]
+    return slower[keys + ["seconds_baseline", "seconds"]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AGADIR/QUALI NV pipeline")
+    parser.add_argument("--sizes", default="21,300,1500", help="Vendors per generated workbook (8 AGADIR rows each)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage, the fastest is kept")
+    parser.add_argument("--rest-days", type=int, default=16)
+    parser.add_argument("--full", action="store_true", help="Load full workbooks instead of read-only streams")
+    parser.add_argument("--engines", default=DEFAULT_ENGINE,
+                        help=f"Source readers to compare, among {','.join(available_engines())}")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "excel-converter-bench"),
+                        help="Where the generated workbooks are kept between runs")
+    parser.add_argument("--output", help="Write the results as JSON, e.g. to use as a later --baseline")
+    parser.add_argument("--baseline", help="Earlier --output to compare with, exit 1 on a slowdown")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    engines = args.engines.split(",")
+    missing = [engine for engine in engines if engine not in available_engines()]
+    if missing:
+        parser.error(f"engines not available here: {', '.join(missing)}")
+    results = run(sizes, args.workdir, args.rest_days, args.repeat, read_only=not args.full, engines=engines)
+    print(results.to_string(index=False))
+    if args.output:
+        results.to_json(args.output, orient="records", indent=2)
+        print(f"📊 Results written to {args.output}")
+    if args.baseline:
+        slower = regressions(results, pd.read_json(args.baseline), args.tolerance)
+        if not slower.empty:
+            print(f"❌ Slower than {args.baseline}:")
+            print(slower.to_string(index=False))
+            return 1
+        print(f"✅ No stage slower than {args.baseline} by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
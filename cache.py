@@ -0,0 +1,89 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def file_digest(path, chunk_size=1024 * 1024) -> str:
+    """
+    return the SHA-256 hex digest of a file, read in chunks. path may also be
+    a bytes-like object (hashed in place) or a binary file object (read from
+    its start)
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(path).hexdigest()
+    digest = hashlib.sha256()
+    if hasattr(path, "read"):
+        path.seek(0)
+        for chunk in iter(lambda: path.read(chunk_size), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def value_size(value) -> int:
+    """Approximate memory held by a cached value (DataFrames, bytes, nested tuples, lists and dicts)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value.values())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Process-wide LRU cache for processed uploads.
+    Keys start with the SHA-256 of the uploaded bytes, so the same workbook
+    uploaded again is found whatever its temporary file name.
+    Bounded by entry count and by the approximate bytes the entries hold.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """return the cached value for key, or None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """
+        Store value, evicting the least recently used entries above max_entries
+        or max_bytes (the newest entry is always kept)
+        """
+        size = value_size(value)
+        with self._lock:
+            self.size += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                              or (self.max_bytes is not None and self.size > self.max_bytes)):
+                oldest, _ = self._entries.popitem(last=False)
+                self.size -= self._sizes.pop(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+
+AGADIR_COLUMNS = [
+    "Vendeur", "Famille", "REAL", "OBJ", "Percent", "REAL 2025",
+    "H 2024", "H %", "EnCours", "OBJ MOIS", "RAF",
+]
+QUALI_COLUMNS = [
+    "Vendeur", "CLT PROGRAMME", "ACM", "Moy L/BL", "Obj L/BL",
+    "LINE", "TSM", "RAF TSM", "RAF ACM",
+]
+# Columns written back as whole numbers in the AGADIR sheet
+# (RAF is truncated too, when it is spread over the rest days)
+AGADIR_INT_COLUMNS = ["REAL", "OBJ", "OBJ MOIS", "REAL 2025", "H 2024", "EnCours"]
+
+
+def is_number(value) -> bool:
+    """Same numeric test the sheet code uses for a single cell value"""
+    return isinstance(value, (int, float))
+
+
+def numeric_column(column: pd.Series):
+    """
+    return (mask, values) where mask flags numeric cells and values holds
+    them as float64 (NaN elsewhere)
+    """
+    mask = column.map(is_number).to_numpy(dtype=bool)
+    values = np.full(len(column), np.nan)
+    values[mask] = column.to_numpy(dtype=object)[mask].astype(float)
+    return mask, values
+
+
+def _cells(mask, values, fallback=None):
+    """Build an object array of Python values, using fallback where mask is False"""
+    if fallback is None:
+        out = np.full(len(mask), None, dtype=object)
+    else:
+        out = fallback.to_numpy(dtype=object, copy=True)
+    out[mask] = values[mask].tolist()
+    return out
+
+
+def _truncate(mask, values, fallback=None):
+    """int() every masked cell, leaving the other cells as they are"""
+    whole = np.zeros(len(values), dtype=np.int64)
+    whole[mask] = np.trunc(values[mask])
+    return _cells(mask, whole, fallback)
+
+
+def agadir_base(table: pd.DataFrame, day_work: int, worked_days: int):
+    """
+    Rest-days independent part of the AGADIR calculations: REAL (+EnCours),
+    Percent, OBJ MOIS and the integer columns.
+    return (table, remaining) where remaining maps RAF to (mask, OBJ MOIS - REAL)
+    for spread_over_rest_days
+    """
+    table = table.copy()
+    real_mask, real = numeric_column(table["REAL"])
+    obj_mask, obj = numeric_column(table["OBJ"])
+    encours_mask, encours = numeric_column(table["EnCours"])
+
+    # REAL = REAL + EnCours
+    real = np.where(real_mask & encours_mask, real + encours, real)
+    table["REAL"] = _cells(real_mask, real, table["REAL"])
+
+    # Percent = (REAL / OBJ) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = real / obj - 1
+    table["Percent"] = _cells(real_mask & obj_mask & (obj != 0), percent)
+
+    # OBJ MOIS = OBJ * day_work / worked_days, which has no value on the first
+    # day of the month ("0/ 24 jours"): fail like the per-cell code did instead
+    # of writing inf truncated to int64
+    if worked_days == 0 and obj_mask.any():
+        raise ZeroDivisionError("AGADIR!C6 reports 0 worked days, OBJ MOIS can't be computed")
+    obj_mois = obj * day_work / worked_days
+    table["OBJ MOIS"] = _cells(obj_mask, obj_mois)
+
+    # RAF = (OBJ MOIS - REAL) / rest_days, the division is left to spread_over_rest_days
+    table["RAF"] = None
+    remaining = {"RAF": (obj_mask & real_mask, obj_mois - real)}
+
+    # Convert REAL, OBJ, OBJ MOIS, ... columns to integers
+    for name in AGADIR_INT_COLUMNS:
+        mask, values = numeric_column(table[name])
+        table[name] = _truncate(mask, values, table[name])
+    return table, remaining
+
+
+def quali_base(table: pd.DataFrame):
+    """
+    Rest-days independent part of the QUALI NV calculations.
+    return (table, remaining) where remaining maps RAF TSM and RAF ACM to
+    (mask, CLT PROGRAMME - CLT PROGRAMME * ratio)
+    """
+    table = table.copy()
+    clients_mask, clients = numeric_column(table["CLT PROGRAMME"])
+    remaining = {}
+    for ratio_name, target in [("TSM", "RAF TSM"), ("ACM", "RAF ACM")]:
+        ratio_mask, ratio = numeric_column(table[ratio_name])
+        remaining[target] = (clients_mask & ratio_mask, clients - clients * ratio)
+        table[target] = None
+    return table, remaining
+
+
+def spread_over_rest_days(table: pd.DataFrame, remaining, jour_rest=None) -> pd.DataFrame:
+    """
+    Only rest-days dependent step: int(remaining / jour_rest) into each column
+    of remaining, None where the inputs were not numbers or jour_rest is unset
+    """
+    table = table.copy()
+    for name, (mask, values) in remaining.items():
+        table[name] = _truncate(mask & bool(jour_rest), values / (jour_rest or np.nan))
+    return table
+
+
+def compute_agadir(table: pd.DataFrame, day_work: int, worked_days: int, jour_rest=None) -> pd.DataFrame:
+    """
+    Compute REAL (+EnCours), Percent, OBJ MOIS and RAF for the AGADIR data rows
+    in one pass over whole columns and return a new table ready to write back
+    """
+    return spread_over_rest_days(*agadir_base(table, day_work, worked_days), jour_rest)
+
+
+def compute_quali(table: pd.DataFrame, jour_rest=None) -> pd.DataFrame:
+    """
+    Compute RAF TSM and RAF ACM for the QUALI NV data rows:
+    RAF = (CLT PROGRAMME - CLT PROGRAMME * ratio) / rest_days
+    """
+    return spread_over_rest_days(*quali_base(table), jour_rest)
@@ -0,0 +1,54 @@
+import json
+import os
+
+
+DAYS_FILE = "days.json"
+
+
+class DayWork:
+    """
+    Day counts of the month read from AGADIR!C6 ("8/ 24 ..."):
+    days worked so far and total days of the month
+    """
+
+    def __init__(self, worked, total):
+        self.worked = int(worked)
+        self.total = int(total)
+
+    @classmethod
+    def from_cell(cls, value):
+        """Parse the C6 text, e.g. "8/ 24 jours" -> DayWork(8, 24)"""
+        parts = value.split(" ", 2)
+        return cls(parts[0].replace("/", ""), parts[1].strip())
+
+    @classmethod
+    def load(cls, path=DAYS_FILE, default=None):
+        """
+        return the persisted default from days.json, or default when the file
+        is missing or unreadable
+        """
+        try:
+            with open(path, "r") as jsonFile:
+                data = json.load(jsonFile)
+            return cls(data["from_file"]["d"], data["from_file"]["t"])
+        except (FileNotFoundError, KeyError, ValueError, TypeError):
+            return default
+
+    def save(self, path=DAYS_FILE):
+        """Persist as the default for later runs, keeping other keys of the file"""
+        data = {}
+        if os.path.exists(path):
+            with open(path, "r") as jsonFile:
+                data = json.load(jsonFile)
+        data["from_file"] = {"t": str(self.total), "d": str(self.worked)}
+        with open(path, "w") as jsonFile:
+            json.dump(data, jsonFile)
+
+    def as_tuple(self) -> tuple:
+        return self.worked, self.total
+
+    def __eq__(self, other):
+        return isinstance(other, DayWork) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return f"DayWork(worked={self.worked}, total={self.total})"
@@ -1,206 +1,310 @@
-import time
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Fill, PatternFill, GradientFill
-import json
 import pandas as pd
 import os
-from google_sheets import GoogleSheetsService
+from calculations import AGADIR_COLUMNS, QUALI_COLUMNS, agadir_base, quali_base, spread_over_rest_days
+from layout import LAYOUTS
+from exporter import export_tables
+from cache import file_digest
+from day_work import DayWork
+from table_store import save_tables, load_table, tables_dir_for
+from timing import span
+from readers import DEFAULT_ENGINE, open_workbook, read_metadata, source_file
+
+
+def read_table(rows, columns) -> pd.DataFrame:
+    """
+    Put the data rows of a processed table (header row first) into a DataFrame
+    holding the raw cell values
+    """
+    return pd.DataFrame(rows[1:], columns=columns, dtype=object)
+
+
+def header_names(header) -> list:
+    """
+    Column names pd.read_excel gives a header row: "Unnamed: <i>" for empty
+    cells and ".1", ".2"... appended to repeated names (the same renaming as
+    pandas' python parser, named columns first)
+    """
+    names = [f"Unnamed: {i}" if value is None or value == "" else value for i, value in enumerate(header)]
+    unnamed = [i for i, value in enumerate(header) if value is None or value == ""]
+    counts = {}
+    for i in [i for i in range(len(names)) if i not in unnamed] + unnamed:
+        name = original = names[i]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def table_to_dataframe(rows) -> pd.DataFrame:
+    """
+    Build the DataFrame pd.read_excel would return for a processed table,
+    straight from the values already in memory
+    """
+    if not rows:
+        return pd.DataFrame()
+    data = [[float("nan") if value is None else value for value in row] for row in rows[1:]]
+    # Drop trailing empty rows like pandas does
+    while data and pd.isna(data[-1]).all():
+        data.pop()
+    return pd.DataFrame(data, columns=header_names(rows[0]), dtype=object).infer_objects()
+
+
+# Where fix_sheet saves its result unless told otherwise (None keeps it in memory only)
+DEFAULT_OUTPUT_PATH = "excel/finale_jour.xlsx"
 
 
 class Excel:
 
-    def __init__(self, path, rest_days=None):
+    def __init__(self, path, rest_days=None, read_only=False, cache=None, digest=None, days=None,
+                 output_path=DEFAULT_OUTPUT_PATH, progress=None, tables_path=None, engine=None):
         self.__day_work = 24
+        # Path of the source workbook, or the workbook itself already in memory
+        # (bytes, memoryview or a binary file object), parsed in place
         self.path = path
         self.rest_days = rest_days
         self.ttc_rate = 1,2
+        # read_only streams only AGADIR and QUALI NV instead of loading every sheet
+        self.read_only = read_only
+        # Reader of the source in read-only mode ("openpyxl", "xml" or "calamine",
+        # see readers.py), full loads are always openpyxl
+        self.engine = (engine or DEFAULT_ENGINE) if read_only else "openpyxl"
+        self._workbook = None
+        # DayWork of this file, set by get_day_work (or given) and used by fix_sheet
+        self.days = days
+        # Sheet names, dimensions and C6 of the source, probed by get_day_work
+        self.metadata = None
+        # Optional ResultCache shared between uploads, keyed on the file's SHA-256
+        self.cache = cache
+        self._digest = digest
+        # Rest-days independent stage per worked days, so new rest days skip everything else
+        self._base = {}
+        # Results of fix_sheet, kept in memory for display, download and upload
+        self.agadir = None
+        self.quali_nv = None
+        self._output = None
+        # (layout, rows) of the last fix_sheet, exported to XLSX only when output is used
+        self._processed = None
+        # Cache key of the last fix_sheet result, whose entry gets the export once it is done
+        self._result_key = None
+        self.output_path = output_path
+        # Directory where fix_sheet stores the tables for fast reloads (Feather),
+        # next to the output file by default
+        if tables_path is None and output_path is not None:
+            tables_path = tables_dir_for(output_path)
+        self.tables_path = tables_path
+        # Optional progress(percent, stage) callback, e.g. a background job's report
+        self.progress = progress
 
-    def get_day_work(self) -> tuple:
+    def _report(self, percent, stage):
+        if self.progress is not None:
+            self.progress(percent, stage)
+
+    def load(self):
         """
-        return tuple as total days of month and day works
+        return the source workbook, parsing it only on first use
         """
-        wb = load_workbook(self.path)
-        sheet_ranges = wb["AGADIR"]
-        # wb.active
-        day_work = sheet_ranges["C6"].value
-        day_work = day_work.split(" ", 2)
-        a: str = day_work[0].replace("/", "")
-        b: str = day_work[1]
+        if self._workbook is None:
+            with span("load_workbook", read_only=self.read_only, engine=self.engine):
+                self._workbook = open_workbook(self.path, self.engine, read_only=self.read_only)
+        return self._workbook
 
-        print(f"day work is : {int(a), int(b)}")
-        with open("days.json", "r") as jsonFile:
-            data = json.load(jsonFile)
+    def close(self):
+        """
+        Release the parsed source (read-only workbooks keep the file open)
+        """
+        if self._workbook is not None and self.read_only:
+            self._workbook.close()
+        self._workbook = None
 
-        data["from_file"] = {"t": b, "d": a}
+    @property
+    def output(self) -> bytes:
+        """
+        XLSX bytes of the processed sheets, exported on first use
+        """
+        if self._output is None and self._processed is not None:
+            with span("export"):
+                self._output = export_tables(self._processed)
+            # Later hits on the same result reuse these bytes instead of exporting again
+            cached = self._cached(*self._result_key) if self._result_key else None
+            if cached is not None and cached[3] is None:
+                self._store(cached[:3] + (self._output,), *self._result_key)
+        return self._output
 
-        with open("days.json", "w") as jsonFile:
-            json.dump(data, jsonFile)
+    @output.setter
+    def output(self, value):
+        self._output = value
 
-        return int(a), int(b.strip())
+    @property
+    def digest(self) -> str:
+        """
+        SHA-256 of the source file, computed on first use
+        """
+        if self._digest is None:
+            self._digest = file_digest(self.path)
+        return self._digest
 
-    
+    def _cached(self, *key):
+        if self.cache is None:
+            return None
+        # Engines may not read a file exactly alike, so each keeps its own entries
+        return self.cache.get((self.digest, self.engine) + key)
+
+    def _store(self, value, *key):
+        if self.cache is not None:
+            self.cache.put((self.digest, self.engine) + key, value)
+
+    def _reshape(self, source):
+        """
+        Cut the AGADIR and QUALI NV tables out of the source with their layouts,
+        one pass per sheet, as lists of rows with the header first
+        """
+        tables = {}
+        for layout in LAYOUTS:
+            with span("reshape", sheet=layout.name) as record:
+                tables[layout.name] = layout.apply(source[layout.name].iter_rows(values_only=True))
+                record["rows"] = len(tables[layout.name]) - 1
+        return tables
+
+    def get_day_work(self) -> tuple:
+        """
+        return tuple as total days of month and day works
+        """
+        cached = self._cached("day_work")
+        if cached is None:
+            self._report(5, "Reading the workbook...")
+            with span("day_work"):
+                # Only AGADIR!C6 and the sheet headers are read, not the workbook
+                metadata = read_metadata(self.path, "AGADIR", ("C6",))
+                days = DayWork.from_cell(metadata["cells"]["C6"])
+            self._store((days, metadata), "day_work")
+        else:
+            days, metadata = cached
+        self.days = days
+        self.metadata = metadata
+        self._report(20, f"Day work extracted: {days.worked}/{days.total} days")
+        return days.as_tuple()
 
+    @span("fix_sheet")
     def fix_sheet(self, jour_rest=None):
-        # Use custom rest_days if available, otherwise use jour_rest parameter
-        
+        # Days worked come from get_day_work, else from the persisted days.json default
+        days = self.days or DayWork.load(default=DayWork(4, 24))
+        worked_days = days.worked
 
-        wb = load_workbook(self.path)
-        sheet_ranges_quali = wb["QUALI NV"]
-        sheet_ranges_quali.unmerge_cells("E1:K2")
-        sheet_ranges_quali.delete_rows(1, 7)
-        sheet_ranges_quali.delete_rows(2, 4)
-        sheet_ranges_quali.delete_rows(10, 1)
-        sheet_ranges_quali.delete_cols(1, 3)
-        sheet_ranges_quali.delete_cols(2, 3)
-        sheet_ranges_quali.delete_cols(3, 3)
-        sheet_ranges_quali.delete_cols(4, 11)
-        sheet_ranges_quali.delete_cols(7, 2)
-        sheet_ranges_quali.delete_rows(sheet_ranges_quali.max_row - 1)
-
-        sheet_ranges_quali['A1'] = "Vendeur"
-        sheet_ranges_quali['C1'] = "ACM"
-        sheet_ranges_quali['F1'] = "LINE"
-        sheet_ranges_quali['G1'] = "TSM"
-        sheet_ranges_quali['H1'] = "RAF TSM"
-        sheet_ranges_quali['I1'] = "RAF ACM"
-        sheet_ranges_quali['A21'] = "CHAKIB ELFIL"
-        sheet_ranges_quali['A10'] = "BOUTMEZGUINE EL MOSTAFA"
-        # Calculate RAF TSM using cell values instead of cell objects
-       
-            # Compute RAF TSM = (TSM - TSM * H%) / rest_days
-        for row in range(2, sheet_ranges_quali.max_row + 1):
-            tsm_val = sheet_ranges_quali[f"G{row}"].value
-            client_number = sheet_ranges_quali[f"B{row}"].value
-            if isinstance(tsm_val, (int, float)) and isinstance(client_number, (int, float)) and jour_rest:
-                sheet_ranges_quali[f"H{row}"].value = int((client_number - (client_number * tsm_val)) / jour_rest)
+        self._result_key = ("result", self.read_only, jour_rest, worked_days)
+        result = self._cached(*self._result_key)
+        if result is not None:
+            self.close()
+            agadir, quali_nv, self._processed, self._output = result
+            # Every hit gets its own tables, an edit in one session must not reach the others
+            self.agadir, self.quali_nv = agadir.copy(), quali_nv.copy()
+            self._write_output()
+            return True
 
-            else:
-                sheet_ranges_quali[f"H{row}"].value = None
-             # Compute RAF ACM = (ACM - ACM * H%) / rest_days    
-        for row in range(2, sheet_ranges_quali.max_row + 1):
-            acm_val = sheet_ranges_quali[f"C{row}"].value
-            client_number = sheet_ranges_quali[f"B{row}"].value
-            if isinstance(acm_val, (int, float)) and isinstance(client_number, (int, float)) and jour_rest:
-                sheet_ranges_quali[f"I{row}"].value = int((client_number - (client_number * acm_val)) / jour_rest)
+        base = self._base.get(worked_days) or self._cached("base", worked_days)
+        source = None if self.read_only else self.load()
+        if base is None:
+            tables = self._cached("tables")
+            if tables is None:
+                self._report(30, "Reading AGADIR and QUALI NV...")
+                source = source or self.load()
+                tables = self._reshape(source)
+                self._store(tables, "tables")
+            self._report(55, "Computing columns...")
+            base = self._base_stage(tables, worked_days)
+            self._store(base, "base", worked_days)
+        self._base[worked_days] = base
+        if self.read_only:
+            self.close()
+        else:
+            # The source is consumed here, so a later call starts from a fresh parse
+            self._workbook = None
 
-            else:
-                sheet_ranges_quali[f"I{row}"].value = None
-        sheet_ranges_quali['G1'].fill = PatternFill("solid", fgColor="4cbb17")
-        sheet_ranges_quali["F1"].fill = PatternFill("solid", fgColor="4cbb17")
+        # Only RAF, RAF TSM and RAF ACM depend on the rest days
+        self._report(70, "Spreading RAF over the rest days...")
+        tables = {}
+        for name, (header, table, remaining) in base.items():
+            with span("spread_rest_days", sheet=name, rows=len(table), rest_days=jour_rest):
+                table = spread_over_rest_days(table, remaining, jour_rest)
+                tables[name] = [header] + table.values.tolist()
+
+        with span("dataframes"):
+            self.agadir = table_to_dataframe(tables["AGADIR"])
+            self.quali_nv = table_to_dataframe(tables["QUALI NV"])
+        processed = [(layout, tables[layout.name]) for layout in LAYOUTS]
+        self._report(80, "Writing the output file...")
+        if self.read_only:
+            # Only the two processed sheets go to the output file, exported when needed
+            self._processed = processed
+            self._output = None
+        else:
+            self._processed = None
+            with span("export", rows=sum(len(rows) - 1 for _, rows in processed)):
+                self._output = export_tables(processed, workbook=source)
+        self._store((self.agadir.copy(), self.quali_nv.copy(), self._processed, self._output), *self._result_key)
+        self._write_output()
+        return True
+
+    def _base_stage(self, tables, worked_days):
+        """
+        Run every calculation that does not depend on the rest days.
+        return {sheet name: (header row, table, remaining amounts)}
+        """
+        # RAF TSM and RAF ACM = (CLT - CLT * ratio) / rest_days
+        with span("compute", sheet="QUALI NV", rows=len(tables["QUALI NV"]) - 1):
+            quali, quali_remaining = quali_base(read_table(tables["QUALI NV"], QUALI_COLUMNS))
         ## AGADIR
-        sheet_ranges_quanti = wb["AGADIR"]
-        sheet_ranges_quanti.unmerge_cells("A8:A9")
-        sheet_ranges_quanti.unmerge_cells("B8:B9")
-        sheet_ranges_quanti.unmerge_cells("D8:D9")
-        sheet_ranges_quanti.unmerge_cells("F8:J8")
-        sheet_ranges_quanti.unmerge_cells("K8:O8")
-        #delete columns
-        sheet_ranges_quanti.delete_cols(1, 2) 
-        sheet_ranges_quanti.delete_cols(3, 1) 
-        sheet_ranges_quanti.delete_cols(6, 2) 
-        sheet_ranges_quanti.delete_cols(7, 2) 
-        sheet_ranges_quanti.delete_cols(9, 1)  
-        sheet_ranges_quanti.delete_cols(10, 1) 
-        #delete rowsre
-        sheet_ranges_quanti.delete_rows(1, 8)
-        sheet_ranges_quanti.delete_rows(2, 32)
-        sheet_ranges_quanti.delete_rows(154, 8)
-        sheet_ranges_quanti.delete_rows(170, 14)
-        sheet_ranges_quanti['A1'] = "Vendeur"
-        sheet_ranges_quanti['B1'] = "Famille"
-        sheet_ranges_quanti['C1'] = "REAL"
-        sheet_ranges_quanti['D1'] = "OBJ"
-        sheet_ranges_quanti['E1'] = "Percent"
-        sheet_ranges_quanti['F1'] = "REAL 2025"
-
-        sheet_ranges_quanti['G1'] = "H 2024"
-        sheet_ranges_quanti['H1'] = "H %"
-        sheet_ranges_quanti['I1'] = "EnCours"
-        sheet_ranges_quanti['J1'] = "OBJ MOIS"
-        sheet_ranges_quanti['K1'] = "RAF"
-        sheet_ranges_quanti['K21'] = "CHAKIB ELFIL"
-        sheet_ranges_quanti['K10'] = "BOUTMEZGUINE EL MOSTAFA"
-        
+        # REAL + EnCours, Percent, OBJ MOIS and the integer columns in one pass
+        with span("compute", sheet="AGADIR", rows=len(tables["AGADIR"]) - 1):
+            agadir, agadir_remaining = agadir_base(
+                read_table(tables["AGADIR"], AGADIR_COLUMNS), self.__day_work, worked_days
+            )
+        return {
+            "AGADIR": (tables["AGADIR"][0], agadir, agadir_remaining),
+            "QUALI NV": (tables["QUALI NV"][0], quali, quali_remaining),
+        }
 
-        for i in range(sheet_ranges_quanti.max_row):
-            # Replace '%' strings with None for proper numeric handling
-            if sheet_ranges_quanti[f"E{i + 1}"].value == '%':
-                sheet_ranges_quanti[f"E{i + 1}"].value = None
-            # Convert percentage values to decimal (e.g., 85% -> 0.85)
-            elif isinstance(sheet_ranges_quanti[f"E{i + 1}"].value, (int, float)) and i > 0:
-                # If value is greater than 1, assume it's a percentage and convert to decimal
-                if sheet_ranges_quanti[f"E{i + 1}"].value > 1:
-                    sheet_ranges_quanti[f"E{i + 1}"].value = sheet_ranges_quanti[f"E{i + 1}"].value / 100
-            
-            if sheet_ranges_quanti[f"B{i + 1}"].value == 'SAUCES TACOS':
-                sheet_ranges_quanti[f"B{i + 1}"].value = 'SAUCES'
-
-            # Collect all values from column I into an array
-            # Add all values from column I to corresponding cells in column C
-            for row in range(2, sheet_ranges_quanti.max_row + 1):
-                c_val = sheet_ranges_quanti[f"C{row}"].value
-                i_val = sheet_ranges_quanti[f"I{row}"].value
-                if isinstance(c_val, (int, float)) and isinstance(i_val, (int, float)):
-                    sheet_ranges_quanti[f"C{row}"].value = c_val + i_val
-            
-            
-            
-            # Compute Percent column: (REAL / OBJ) - 1
-            for row in range(2, sheet_ranges_quanti.max_row + 1):
-                real_val = sheet_ranges_quanti[f"C{row}"].value
-                obj_val = sheet_ranges_quanti[f"D{row}"].value
-                if isinstance(real_val, (int, float)) and isinstance(obj_val, (int, float)) and obj_val != 0:
-                    sheet_ranges_quanti[f"E{row}"].value = (real_val / obj_val) - 1
-                else:
-                    sheet_ranges_quanti[f"E{row}"].value = None
-            
-            # Load the days.json file to get the "b" value
-            with open("days.json", "r") as jsonFile:
-                data = json.load(jsonFile)
-            b_value = data["from_file"]["d"]  # "d" holds the "b" value (total days in month)
-
-            # Compute OBJ MOIS = OBJ * self.__day_work / b
-            for row in range(2, sheet_ranges_quanti.max_row + 1):
-                obj_val = sheet_ranges_quanti[f"D{row}"].value
-                if isinstance(obj_val, (int, float)):
-                    sheet_ranges_quanti[f"J{row}"].value = obj_val * self.__day_work / int(b_value)
-                else:
-                    sheet_ranges_quanti[f"J{row}"].value = None
-
-
-            # Compute RAF = (OBJ MOIS - REAL) / rest_days
-            for row in range(2, sheet_ranges_quanti.max_row + 1):
-                obj_mois_val = sheet_ranges_quanti[f"J{row}"].value
-                real_val = sheet_ranges_quanti[f"C{row}"].value
-                if isinstance(obj_mois_val, (int, float)) and isinstance(real_val, (int, float)) and jour_rest:
-                    sheet_ranges_quanti[f"K{row}"].value = (obj_mois_val - real_val) / jour_rest
-                else:
-                    sheet_ranges_quanti[f"K{row}"].value = None
-           
-           
-            
-            # Convert REAL, OBJ, OBJ MOIS, RAF columns to integers
-            for row in range(2, sheet_ranges_quanti.max_row + 1):
-                for col in ["C", "D", "J", "K","F","G","I" ]:
-                    cell = sheet_ranges_quanti[f"{col}{row}"]
-                    if isinstance(cell.value, (int, float)):
-                        cell.value = int(cell.value)
-            wb.save("excel/finale_jour.xlsx")
-            return True
+    def _write_output(self):
+        if self.tables_path is not None:
+            with span("save_tables"):
+                save_tables(self.tables_path, {"AGADIR": self.agadir, "QUALI NV": self.quali_nv})
+        if self.output_path is None:
+            return
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        output = self.output
+        with span("save", bytes=len(output)):
+            with open(self.output_path, "wb") as output_file:
+                output_file.write(output)
     
     def get_quali_nv_dataframe(self):
         """
         Extract QUALI NV sheet data as a DataFrame
         """
+        if self.quali_nv is not None:
+            return self.quali_nv
         try:
+            # The stored tables load far faster than the XLSX
+            if self.tables_path:
+                df_quali = load_table(self.tables_path, "QUALI NV")
+                if df_quali is not None:
+                    return df_quali
             # Read the QUALI NV sheet from the processed file
-            output_path = "excel/finale_jour.xlsx"
-            if os.path.exists(output_path):
-                df_quali = pd.read_excel(output_path, sheet_name='QUALI NV')
+            output_path = self.output_path
+            if output_path and os.path.exists(output_path):
+                with span("read_excel", sheet="QUALI NV") as record:
+                    df_quali = pd.read_excel(output_path, sheet_name='QUALI NV')
+                    record["rows"] = len(df_quali)
                 return df_quali
             else:
                 # If processed file doesn't exist, read from original
-                df_quali = pd.read_excel(self.path, sheet_name='QUALI NV')
+                with span("read_excel", sheet="QUALI NV") as record:
+                    df_quali = pd.read_excel(source_file(self.path), sheet_name='QUALI NV')
+                    record["rows"] = len(df_quali)
                 return df_quali
         except Exception as e:
             print(f"Error reading QUALI NV sheet: {e}")
@@ -0,0 +1,52 @@
+import io
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+
+def header_fill():
+    return PatternFill("solid", fgColor="4cbb17")
+
+
+def export_tables(tables, workbook=None) -> bytes:
+    """
+    Serialize processed tables to XLSX bytes.
+    tables is a list of (layout, rows) with the header as the first row.
+    Without a workbook only these sheets are written, through a write_only
+    workbook that streams rows straight to the file. With a workbook the
+    tables replace its sheets of the same name and everything is saved.
+    """
+    if workbook is None:
+        wb = Workbook(write_only=True)
+        for layout, rows in tables:
+            sheet = wb.create_sheet(layout.name)
+            for number, row in enumerate(rows, start=1):
+                if number == 1 and layout.highlight:
+                    row = _highlighted_header(sheet, layout, row)
+                sheet.append(row)
+    else:
+        wb = workbook
+        for layout, rows in tables:
+            index = wb.sheetnames.index(layout.name)
+            wb.remove(wb[layout.name])
+            sheet = wb.create_sheet(layout.name, index)
+            for row in rows:
+                sheet.append(row)
+            for coordinate in layout.highlight:
+                sheet[coordinate].fill = header_fill()
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _highlighted_header(sheet, layout, row):
+    """Wrap the header values in write-only cells so the highlight fill is kept"""
+    cells = []
+    for column, value in enumerate(row, start=1):
+        cell = WriteOnlyCell(sheet, value=value)
+        if f"{get_column_letter(column)}1" in layout.highlight:
+            cell.fill = header_fill()
+        cells.append(cell)
+    return cells
@@ -1,18 +1,192 @@
 import gspread
+from gspread.exceptions import APIError
+from gspread.utils import absolute_range_name, rowcol_to_a1
 from google.auth import default
 from google.oauth2.service_account import Credentials
 import pandas as pd
+from table_store import load_table, tables_dir_for
+from timing import span
 import streamlit as st
+import hashlib
 import json
 import os
+import random
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+DEFAULT_SPREADSHEET_ID = "1cRNqohML-mZ2mMqXIfQlPPDQUmRGLmRzDfp3j0wpte4"
+
+# Where each processed sheet is published, overridden by [[publish_routes]]
+# tables in the Streamlit secrets
+DEFAULT_ROUTES = [
+    {"sheet": "AGADIR", "spreadsheet_id": DEFAULT_SPREADSHEET_ID, "worksheet": "Suivi Test"},
+    {"sheet": "QUALI NV", "spreadsheet_id": DEFAULT_SPREADSHEET_ID, "worksheet": "quali SOM VMM"},
+]
+# Spreadsheets pushed at the same time by publish_to_google_sheets
+PUBLISH_WORKERS = 4
+
+# Authorized clients shared by every GoogleSheetsService of the process, keyed by
+# service account. gspread's AuthorizedSession keeps one pooled HTTP session and
+# only asks for a new token when the current one expires, so later uploads skip
+# the token exchange. Spreadsheets opened with a client are kept next to it.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# Last grid pushed to each (spreadsheet id, worksheet title), the baseline of
+# the next incremental sync
+_pushed_grids = {}
+_pushed_lock = threading.Lock()
+
+# Uploads are sent in values:batchUpdate requests of at most this many cells,
+# well below the request size limit
+UPLOAD_CHUNK_CELLS = 50000
+# Chunks already sent by a push that failed, keyed by (spreadsheet id, digest of
+# the chunks), so pushing the same data again resumes after them
+_checkpoints = {}
+
+RETRY_ATTEMPTS = 6
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def with_retry(call, *args, **kwargs):
+    """
+    Run a Sheets API call, retrying rate limits (429), timeouts and 5xx errors
+    with exponential backoff and jitter. A Retry-After header from Google is
+    waited out when it asks for longer than the backoff.
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return call(*args, **kwargs)
+        except (APIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            response = getattr(e, "response", None)
+            status = getattr(response, "status_code", None)
+            if isinstance(e, APIError) and status not in RETRY_STATUSES:
+                raise
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = 2 ** attempt + random.uniform(0, 1)
+            try:
+                delay = max(delay, float(response.headers.get("Retry-After")))
+            except (AttributeError, TypeError, ValueError):
+                pass
+            print(f"⏳ Google Sheets request failed ({status or type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def chunk_requests(blocks, max_cells=None):
+    """
+    Split blocks of (title, first row, first column, values) into lists of
+    values:batchUpdate data entries holding at most max_cells cells each
+    (UPLOAD_CHUNK_CELLS by default), cutting large blocks into row blocks
+    """
+    max_cells = max_cells or UPLOAD_CHUNK_CELLS
+    chunks, current, cells = [], [], 0
+    for title, row, column, values in blocks:
+        width = max([len(value_row) for value_row in values] + [1])
+        step = max(1, max_cells // width)
+        for start in range(0, len(values), step):
+            part = values[start:start + step]
+            if current and cells + len(part) * width > max_cells:
+                chunks.append(current)
+                current, cells = [], 0
+            current.append({"range": absolute_range_name(title, rowcol_to_a1(row + start, column)), "values": part})
+            cells += len(part) * width
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _cell(grid, row, column):
+    if row < len(grid) and column < len(grid[row]):
+        value = grid[row][column]
+        return "" if value is None else value
+    return ""
+
+
+def grid_diff(old, new):
+    """
+    return the [(a1_range, values)] blocks that turn the old grid into the new
+    one. Changed cells are grouped in runs per row, and runs spanning the same
+    columns on consecutive rows are merged into one rectangle, so a changed
+    column costs one range. Cells missing on either side count as empty, which
+    clears the tail of a grid that shrank.
+    """
+    return [
+        (f"{rowcol_to_a1(first_row, first)}:{rowcol_to_a1(first_row + len(values) - 1, last)}", values)
+        for first_row, first, last, values in _diff_blocks(old, new)
+    ]
+
+
+def _diff_blocks(old, new):
+    """grid_diff as (first row, first column, last column, values), 1-based"""
+    height = max(len(old), len(new))
+    width = max([len(row) for row in old] + [len(row) for row in new] + [0])
+    blocks = []
+    open_blocks = {}
+    for row in range(height):
+        runs = []
+        column = 0
+        while column < width:
+            if _cell(old, row, column) == _cell(new, row, column):
+                column += 1
+                continue
+            first = column
+            while column < width and _cell(old, row, column) != _cell(new, row, column):
+                column += 1
+            runs.append((first, column))
+        still_open = {}
+        for run in runs:
+            block = open_blocks.get(run)
+            if block is None:
+                block = (row, run, [])
+                blocks.append(block)
+            block[2].append([_cell(new, row, column) for column in range(*run)])
+            still_open[run] = block
+        open_blocks = still_open
+    return [(first_row + 1, first + 1, last, values) for first_row, (first, last), values in blocks]
+
+
+def publish_routes():
+    """return the routing table from st.secrets["publish_routes"], or DEFAULT_ROUTES"""
+    try:
+        routes = st.secrets.get("publish_routes")
+    except Exception:
+        routes = None
+    if not routes:
+        return DEFAULT_ROUTES
+    return [dict(route) for route in routes]
+
+
+def _account_key(credentials_info):
+    """Identify a service account by its email and key id"""
+    return credentials_info.get('client_email'), credentials_info.get('private_key_id')
+
+
+def clear_client_cache():
+    """Forget every cached client, e.g. after rotating the service account key"""
+    with _clients_lock:
+        _clients.clear()
+
 
 class GoogleSheetsService:
     def __init__(self):
         self.client = None
         self.credentials = None
+        self._spreadsheets = {}
         
     def authenticate_with_service_account(self, credentials_json):
-        """Authenticate using service account credentials JSON"""
+        """
+        Authenticate using service account credentials JSON.
+        The authorized client is cached per service account and reused.
+        """
         try:
             # Helper to validate required fields in credentials dict
             def _validate_credentials_dict(creds: dict) -> bool:
@@ -26,74 +200,91 @@ class GoogleSheetsService:
                 return True
 
             # Parse credentials from JSON string or file
+            credentials_file = None
             if isinstance(credentials_json, str):
                 if os.path.isfile(credentials_json):
                     # It's a file path
-                    credentials = Credentials.from_service_account_file(
-                        credentials_json,
-                        scopes=[
-                            'https://www.googleapis.com/auth/spreadsheets',
-                            'https://www.googleapis.com/auth/drive'
-                        ]
-                    )
+                    credentials_file = credentials_json
+                    key = ('file', os.path.abspath(credentials_json))
                 else:
                     # It's a JSON string
                     credentials_dict = json.loads(credentials_json)
                     if not _validate_credentials_dict(credentials_dict):
                         return False
-                    credentials = Credentials.from_service_account_info(
-                        credentials_dict,
-                        scopes=[
-                            'https://www.googleapis.com/auth/spreadsheets',
-                            'https://www.googleapis.com/auth/drive'
-                        ]
-                    )
+                    key = _account_key(credentials_dict)
             else:
                 # It's already a dict
-                if not _validate_credentials_dict(credentials_json):
+                credentials_dict = dict(credentials_json)
+                if not _validate_credentials_dict(credentials_dict):
                     return False
-                credentials = Credentials.from_service_account_info(
-                    credentials_json,
-                    scopes=[
-                        'https://www.googleapis.com/auth/spreadsheets',
-                        'https://www.googleapis.com/auth/drive'
-                    ]
-                )
-            
-            self.client = gspread.authorize(credentials)
-            self.credentials = credentials
+                key = _account_key(credentials_dict)
+
+            with _clients_lock:
+                cached = _clients.get(key)
+                if cached is None:
+                    if credentials_file:
+                        credentials = Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
+                    else:
+                        credentials = Credentials.from_service_account_info(credentials_dict, scopes=SCOPES)
+                    with span("authenticate"):
+                        client = gspread.authorize(credentials)
+                    cached = {
+                        'client': client,
+                        'credentials': credentials,
+                        'spreadsheets': {},
+                    }
+                    _clients[key] = cached
+
+            self.client = cached['client']
+            self.credentials = cached['credentials']
+            self._spreadsheets = cached['spreadsheets']
             return True
             
         except Exception as e:
             st.error(f"Authentication failed: {str(e)}")
             return False
+
+    def authenticate_from_secrets(self):
+        """Authenticate with st.secrets["google_service_account"], once per service"""
+        if self.client:
+            return True
+
+        # Get credentials from Streamlit secrets
+        try:
+            credentials_dict = dict(st.secrets["google_service_account"])
+        except KeyError:
+            print("Error: google_service_account not found in secrets. Please add your service account credentials to secrets.toml")
+            return False
+
+        # Authenticate with service account
+        if not self.authenticate_with_service_account(credentials_dict):
+            print("Error: Failed to authenticate with Google Sheets")
+            return False
+
+        print("✅ Authentication successful!")
+        return True
     
-    def upload_quali_nv_to_google_sheets(self, excel_path="excel/finale_jour.xlsx", spreadsheet_id="1cRNqohML-mZ2mMqXIfQlPPDQUmRGLmRzDfp3j0wpte4", worksheet_name="quali SOM VMM"):
+    def upload_quali_nv_to_google_sheets(self, excel_path="excel/finale_jour.xlsx", spreadsheet_id=DEFAULT_SPREADSHEET_ID, worksheet_name="quali SOM VMM", dataframe=None):
         """
-        Upload QUALI NV sheet data to specific Google Sheets ID and worksheet
+        Upload QUALI NV sheet data to specific Google Sheets ID and worksheet.
+        Pass the in-memory dataframe to skip reading excel_path again.
         """
         try:
-            # Get credentials from Streamlit secrets
-            try:
-                credentials_dict = dict(st.secrets["google_service_account"])
-            except KeyError:
-                print("Error: google_service_account not found in secrets. Please add your service account credentials to secrets.toml")
-                return False
-            
-            # Authenticate with service account
-            if not self.authenticate_with_service_account(credentials_dict):
-                print("Error: Failed to authenticate with Google Sheets")
-                return False
-            
-            print("✅ Authentication successful!")
-            
-            # Read the processed Excel file - specifically QUALI NV sheet
-            if not os.path.exists(excel_path):
-                print("Error: Processed Excel file not found. Please process the file first.")
+            if not self.authenticate_from_secrets():
                 return False
             
-            # Convert QUALI NV sheet to DataFrame
-            df_quali = pd.read_excel(excel_path, sheet_name='QUALI NV')
+            if dataframe is not None:
+                df_quali = dataframe
+            else:
+                # Load the stored QUALI NV table, else read it from the processed Excel file
+                df_quali = load_table(tables_dir_for(excel_path), 'QUALI NV')
+                if df_quali is None:
+                    if not os.path.exists(excel_path):
+                        print("Error: Processed Excel file not found. Please process the file first.")
+                        return False
+
+                    # Convert QUALI NV sheet to DataFrame
+                    df_quali = pd.read_excel(excel_path, sheet_name='QUALI NV')
             print(f"✅ QUALI NV sheet loaded with {len(df_quali)} rows")
             
             # Open the specific spreadsheet by ID
@@ -150,7 +341,12 @@ class GoogleSheetsService:
             else:
                 spreadsheet_id = spreadsheet_id_or_url
             
-            spreadsheet = self.client.open_by_key(spreadsheet_id)
+            # Reuse the handle opened earlier with this client, opening costs a request
+            spreadsheet = self._spreadsheets.get(spreadsheet_id)
+            if spreadsheet is None:
+                with span("open_spreadsheet", spreadsheet=spreadsheet_id):
+                    spreadsheet = self.client.open_by_key(spreadsheet_id)
+                self._spreadsheets[spreadsheet_id] = spreadsheet
             return spreadsheet
             
         except Exception as e:
@@ -159,51 +355,256 @@ class GoogleSheetsService:
     
     def upload_dataframe_to_sheet(self, spreadsheet, worksheet_name, dataframe):
         """Upload a pandas DataFrame to a specific worksheet"""
+        return self.upload_dataframes_to_sheets(spreadsheet, {worksheet_name: dataframe})
+    
+    def dataframe_to_grid(self, dataframe):
+        """Convert a DataFrame to a list of lists for gspread, header first"""
+        # Replace NaN values with empty strings to avoid JSON errors
+        dataframe_clean = dataframe.fillna('')
+        return [dataframe_clean.columns.tolist()] + dataframe_clean.values.tolist()
+
+    def _prepare_worksheets(self, spreadsheet, uploads):
+        """
+        Map each upload to its worksheet title (matched case-insensitively) and
+        grid. Missing worksheets are added sized to their data and existing ones
+        too small for it are grown, all in one spreadsheets:batchUpdate.
+        return (grids, titles of the added worksheets)
+        """
+        with span("list_worksheets", spreadsheet=spreadsheet.id):
+            worksheets = with_retry(spreadsheet.worksheets)
+        print(f"Available worksheets: {[ws.title for ws in worksheets]}")
+        existing = {ws.title.lower(): ws for ws in worksheets}
+        grids = {}
+        missing = []
+        changes = []
+        for worksheet_name, dataframe in uploads.items():
+            grid = self.dataframe_to_grid(dataframe)
+            rows, columns = len(grid), max(len(row) for row in grid)
+            worksheet = existing.get(worksheet_name.lower())
+            if worksheet is None:
+                missing.append(worksheet_name)
+                grids[worksheet_name] = grid
+                changes.append({"addSheet": {"properties": {"title": worksheet_name, "gridProperties": {
+                    "rowCount": rows, "columnCount": columns,
+                }}}})
+                continue
+            grids[worksheet.title] = grid
+            if worksheet.row_count < rows or worksheet.col_count < columns:
+                changes.append({"updateSheetProperties": {
+                    "properties": {"sheetId": worksheet.id, "gridProperties": {
+                        "rowCount": max(worksheet.row_count, rows),
+                        "columnCount": max(worksheet.col_count, columns),
+                    }},
+                    "fields": "gridProperties.rowCount,gridProperties.columnCount",
+                }})
+            print(f"✅ Prepared {worksheet.title}: {rows} rows, {columns} columns")
+
+        if changes:
+            print(f"Creating new worksheets: {missing}, growing {len(changes) - len(missing)} others")
+            with span("resize_worksheets", spreadsheet=spreadsheet.id, requests=len(changes)):
+                with_retry(spreadsheet.batch_update, {"requests": changes})
+        return grids, missing
+
+    def _send_values(self, spreadsheet, blocks, before=None):
+        """
+        Write blocks of (title, first row, first column, values) in values:batchUpdate
+        chunks of at most UPLOAD_CHUNK_CELLS cells, each retried on rate limits.
+        When a chunk still fails, the chunks already sent are checkpointed and
+        pushing the same data again resumes after them. before (e.g. clearing the
+        worksheets) runs first, unless resuming.
+        """
+        chunks = chunk_requests(blocks)
+        key = (spreadsheet.id, hashlib.sha256(json.dumps(chunks, default=str).encode()).hexdigest())
+        with _pushed_lock:
+            done = _checkpoints.get(key)
+        if done is None:
+            if before:
+                before()
+            done = 0
+        else:
+            print(f"↩️ Resuming upload after chunk {done}/{len(chunks)}")
+
+        for number in range(done, len(chunks)):
+            try:
+                with span("update", spreadsheet=spreadsheet.id, chunk=number + 1,
+                          rows=sum(len(entry["values"]) for entry in chunks[number])):
+                    with_retry(spreadsheet.values_batch_update, body={"valueInputOption": "RAW", "data": chunks[number]})
+            except Exception:
+                with _pushed_lock:
+                    _checkpoints[key] = number
+                raise
+            print(f"✅ Chunk {number + 1}/{len(chunks)} uploaded")
+        with _pushed_lock:
+            _checkpoints.pop(key, None)
+        return len(chunks)
+
+    def _remember_grids(self, spreadsheet, grids):
+        with _pushed_lock:
+            for title, grid in grids.items():
+                _pushed_grids[(spreadsheet.id, title)] = grid
+
+    def upload_dataframes_to_sheets(self, spreadsheet, uploads):
+        """
+        Upload several DataFrames at once, uploads maps worksheet name -> DataFrame.
+        Costs the same few requests whatever the number of worksheets: one to list
+        the worksheets, one spreadsheets:batchUpdate adding or growing them, one
+        values:batchClear and one values:batchUpdate per UPLOAD_CHUNK_CELLS cells.
+        """
         try:
             if not spreadsheet:
                 raise Exception("No spreadsheet provided")
-            
-            # Get all worksheets first
-            all_worksheets = spreadsheet.worksheets()
-            worksheet_names = [ws.title for ws in all_worksheets]
-            print(f"Available worksheets: {worksheet_names}")
-            
-            # Try to find existing worksheet (case-insensitive)
-            worksheet = None
-            for ws in all_worksheets:
-                if ws.title.lower() == worksheet_name.lower():
-                    worksheet = ws
-                    print(f"✅ Found existing worksheet: {ws.title}")
-                    break
-            
-            if worksheet:
-                # Clear existing data
-                worksheet.clear()
-                print("✅ Cleared existing data")
+
+            grids, missing = self._prepare_worksheets(spreadsheet, uploads)
+
+            cleared = [absolute_range_name(title) for title in grids if title not in missing]
+
+            def clear():
+                with span("clear", spreadsheet=spreadsheet.id, worksheets=len(cleared)):
+                    with_retry(spreadsheet.values_batch_clear, body={"ranges": cleared})
+                print(f"✅ Cleared existing data in {len(cleared)} worksheets")
+
+            chunks = self._send_values(
+                spreadsheet,
+                [(title, 1, 1, grid) for title, grid in grids.items()],
+                before=clear if cleared else None,
+            )
+            print(f"✅ Data uploaded successfully to {len(grids)} worksheets in {chunks} requests")
+            self._remember_grids(spreadsheet, grids)
+            return True
+
+        except Exception as e:
+            print(f"Failed to upload data to sheets: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def sync_dataframes_to_sheets(self, spreadsheet, uploads, refresh=False):
+        """
+        Incremental version of upload_dataframes_to_sheets: only the cell ranges
+        that differ from the last pushed grid are written, in as few
+        values:batchUpdate chunks as they fit, and the worksheets are never
+        blanked in between.
+        The last pushed grids are remembered in memory; worksheets not pushed
+        by this process yet (or all of them with refresh=True, e.g. when people
+        edit the sheet by hand) are read back first in one values:batchGet.
+        """
+        try:
+            if not spreadsheet:
+                raise Exception("No spreadsheet provided")
+
+            grids, missing = self._prepare_worksheets(spreadsheet, uploads)
+
+            with _pushed_lock:
+                previous = {
+                    title: [] if title in missing else None if refresh else _pushed_grids.get((spreadsheet.id, title))
+                    for title in grids
+                }
+            unknown = [title for title, grid in previous.items() if grid is None]
+            if unknown:
+                with span("read_values", spreadsheet=spreadsheet.id, worksheets=len(unknown)):
+                    response = with_retry(
+                        spreadsheet.values_batch_get,
+                        [absolute_range_name(title) for title in unknown],
+                        params={"valueRenderOption": "UNFORMATTED_VALUE"},
+                    )
+                for title, value_range in zip(unknown, response.get("valueRanges", [])):
+                    previous[title] = value_range.get("values", [])
+                print(f"✅ Read current data of {len(unknown)} worksheets")
+
+            blocks = []
+            for title, grid in grids.items():
+                changes = _diff_blocks(previous[title], grid)
+                print(f"✅ {title}: {len(changes)} changed ranges")
+                blocks += [(title, row, column, values) for row, column, _, values in changes]
+
+            if blocks:
+                chunks = self._send_values(spreadsheet, blocks)
+                print(f"✅ Synced {len(blocks)} ranges in {chunks} requests")
             else:
-                print(f"Creating new worksheet: {worksheet_name}")
-                # Create new worksheet
-                worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=26)
-                print("✅ New worksheet created")
-            
-            # Convert DataFrame to list of lists for gspread
-            # Replace NaN values with empty strings to avoid JSON errors
-            dataframe_clean = dataframe.fillna('')
-            data = [dataframe_clean.columns.tolist()] + dataframe_clean.values.tolist()
-            print(f"✅ Prepared data: {len(data)} rows, {len(data[0])} columns")
-            
-            # Upload data
-            worksheet.update('A1', data)
-            print("✅ Data uploaded successfully")
-            
+                print("✅ Google Sheets already up to date")
+            self._remember_grids(spreadsheet, grids)
             return True
-            
+
         except Exception as e:
-            print(f"Failed to upload data to sheet: {str(e)}")
+            print(f"Failed to sync data to sheets: {str(e)}")
             import traceback
             traceback.print_exc()
             return False
-    
+
+    def upload_all_to_google_sheets(self, uploads, spreadsheet_id=DEFAULT_SPREADSHEET_ID, sync=False):
+        """
+        Upload every worksheet name -> DataFrame of uploads to one spreadsheet
+        in a single batch, or only the changed ranges with sync=True.
+        return the spreadsheet URL, or False on failure.
+        """
+        try:
+            if not self.authenticate_from_secrets():
+                return False
+
+            spreadsheet = self.open_spreadsheet(spreadsheet_id)
+            if not spreadsheet:
+                print(f"Error: Failed to open spreadsheet with ID: {spreadsheet_id}")
+                return False
+
+            upload = self.sync_dataframes_to_sheets if sync else self.upload_dataframes_to_sheets
+            if not upload(spreadsheet, uploads):
+                print(f"Error: Failed to upload {list(uploads)} to Google Sheets")
+                return False
+
+            spreadsheet_url = self.get_spreadsheet_url(spreadsheet)
+            print(f"🎉 Upload of {len(uploads)} worksheets completed!")
+            print(f"📊 Spreadsheet URL: {spreadsheet_url}")
+            return spreadsheet_url or True
+
+        except Exception as e:
+            print(f"Error uploading to Google Sheets: {str(e)}")
+            return False
+
+    def publish_to_google_sheets(self, tables, routes=None, sync=True, max_workers=PUBLISH_WORKERS, progress=None):
+        """
+        Publish tables (sheet name -> DataFrame) to every target of the routing
+        table, a list of {"sheet", "spreadsheet_id", "worksheet"} (publish_routes()
+        by default). Worksheets of the same spreadsheet go in one batched upload
+        and the spreadsheets are pushed concurrently, at most max_workers at a
+        time, so publishing takes about as long as the slowest spreadsheet.
+        return {spreadsheet_id: {"worksheets", "url", "seconds"}}, url is False
+        when that spreadsheet failed. progress(percent, stage) is called as each
+        spreadsheet finishes.
+        """
+        targets = {}
+        for route in publish_routes() if routes is None else routes:
+            dataframe = tables.get(route["sheet"])
+            if dataframe is not None:
+                targets.setdefault(route["spreadsheet_id"], {})[route["worksheet"]] = dataframe
+        if not targets:
+            return {}
+
+        # Authenticate once here rather than racing in every worker
+        if not self.authenticate_from_secrets():
+            return {spreadsheet_id: {"worksheets": list(uploads), "url": False, "seconds": 0.0}
+                    for spreadsheet_id, uploads in targets.items()}
+
+        def push(spreadsheet_id, uploads):
+            start = time.perf_counter()
+            with span("publish", spreadsheet=spreadsheet_id, rows=sum(len(df) for df in uploads.values())) as record:
+                url = self.upload_all_to_google_sheets(uploads, spreadsheet_id, sync=sync)
+                if not url:
+                    record["status"] = "error"
+            return {"worksheets": list(uploads), "url": url, "seconds": round(time.perf_counter() - start, 2)}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+            futures = {pool.submit(push, spreadsheet_id, uploads): spreadsheet_id
+                       for spreadsheet_id, uploads in targets.items()}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(100 * len(results) // len(targets),
+                             f"Published {len(results)}/{len(targets)} spreadsheets")
+        failed = sum(1 for result in results.values() if not result["url"])
+        print(f"🎉 Published to {len(results) - failed}/{len(results)} spreadsheets")
+        return results
+
     def share_spreadsheet(self, spreadsheet, email, role='writer'):
         """Share spreadsheet with an email address"""
         try:
@@ -225,32 +626,27 @@ class GoogleSheetsService:
             print(f"Error getting spreadsheet URL: {str(e)}")
             return None
     
-    def upload_excel_to_google_sheets(self, excel_path="excel/finale_jour.xlsx", spreadsheet_id="1cRNqohML-mZ2mMqXIfQlPPDQUmRGLmRzDfp3j0wpte4", worksheet_name="Suivi Test"):
+    def upload_excel_to_google_sheets(self, excel_path="excel/finale_jour.xlsx", spreadsheet_id=DEFAULT_SPREADSHEET_ID, worksheet_name="Suivi Test", dataframe=None):
         """
-        Upload an Excel file to specific Google Sheets ID and worksheet
+        Upload an Excel file to specific Google Sheets ID and worksheet.
+        Pass the in-memory dataframe to skip reading excel_path again.
         """
         try:
-            # Get credentials from Streamlit secrets
-            try:
-                credentials_dict = dict(st.secrets["google_service_account"])
-            except KeyError:
-                print("Error: google_service_account not found in secrets. Please add your service account credentials to secrets.toml")
+            if not self.authenticate_from_secrets():
                 return False
             
-            # Authenticate with service account
-            if not self.authenticate_with_service_account(credentials_dict):
-                print("Error: Failed to authenticate with Google Sheets")
-                return False
-            
-            print("✅ Authentication successful!")
-            
-            # Read the processed Excel file
-            if not os.path.exists(excel_path):
-                print("Error: Processed Excel file not found. Please process the file first.")
-                return False
-            
-            # Convert Excel to DataFrame
-            df = pd.read_excel(excel_path)
+            if dataframe is not None:
+                df = dataframe
+            else:
+                # Load the stored AGADIR table, else read the processed Excel file
+                df = load_table(tables_dir_for(excel_path), 'AGADIR')
+                if df is None:
+                    if not os.path.exists(excel_path):
+                        print("Error: Processed Excel file not found. Please process the file first.")
+                        return False
+
+                    # Convert Excel to DataFrame
+                    df = pd.read_excel(excel_path)
             print(f"✅ Excel file loaded with {len(df)} rows")
             
             # Open the specific spreadsheet by ID
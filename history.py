@@ -0,0 +1,213 @@
+import datetime
+import numbers
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+
+from calculations import AGADIR_COLUMNS, QUALI_COLUMNS
+
+
+HISTORY_PATH = "excel/history.sqlite"
+
+# Columns of each snapshot table that identify a row, the others are figures
+KEYS = {
+    "AGADIR": ["Vendeur", "Famille"],
+    "QUALI NV": ["Vendeur"],
+}
+COLUMNS = {
+    "AGADIR": AGADIR_COLUMNS,
+    "QUALI NV": QUALI_COLUMNS,
+}
+TABLES = {
+    "AGADIR": "agadir_snapshots",
+    "QUALI NV": "quali_snapshots",
+}
+
+
+def sql_name(column) -> str:
+    """SQL column name of a sheet column, e.g. "H %" -> h_percent, "Moy L/BL" -> moy_l_bl"""
+    return re.sub(r"[^0-9a-z]+", "_", column.lower().replace("%", "percent")).strip("_")
+
+
+def _figure(value):
+    # Marker cells like "%" are not figures
+    if isinstance(value, bool) or not isinstance(value, numbers.Number) or pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def _text(value):
+    return None if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+
+def _aligned(name, dataframe) -> pd.DataFrame:
+    """
+    dataframe with the history column names of sheet name. QUALI NV keeps some
+    source header cells, so when the table has the expected number of columns
+    under other names they are matched by position, otherwise the columns that
+    can't be matched are reported instead of silently left out
+    """
+    expected = COLUMNS[name]
+    renamed = [column for column in dataframe.columns if column not in expected]
+    if not renamed:
+        return dataframe
+    if len(dataframe.columns) == len(expected):
+        print(f"⚠️ {name} headers {renamed} differ from the history columns, matched by position")
+        dataframe = dataframe.copy()
+        dataframe.columns = expected
+        return dataframe
+    print(f"⚠️ {name} columns {renamed} are not history columns and were not recorded")
+    return dataframe
+
+
+class HistoryStore:
+    """
+    Every processed AGADIR and QUALI NV snapshot in one SQLite file, keyed by
+    date, Vendeur and Famille, so trends and day-over-day deltas come from
+    indexed queries instead of re-opening old workbooks
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            self._create(connection)
+
+    @contextmanager
+    def _connect(self):
+        """One connection per call (Streamlit runs sessions on several threads), committed and closed"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Readers don't block the writer, e.g. the app while batch.py records
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _create(self, connection):
+        for name, table in TABLES.items():
+            keys = [sql_name(column) for column in KEYS[name]]
+            figures = [sql_name(column) for column in COLUMNS[name] if column not in KEYS[name]]
+            # source tells apart workbooks recorded the same day (e.g. regions in
+            # batch.py) and row keeps the sheet order
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "snapshot_date TEXT NOT NULL, source TEXT NOT NULL DEFAULT '', row INTEGER NOT NULL, "
+                "worked_days INTEGER, rest_days INTEGER, "
+                + ", ".join(f"{key} TEXT" for key in keys) + ", "
+                + ", ".join(f"{figure} REAL" for figure in figures)
+                + ", PRIMARY KEY (snapshot_date, source, row))"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_keys ON {table} ({', '.join(keys)}, snapshot_date)"
+            )
+            if len(keys) > 1:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{keys[-1]} ON {table} ({keys[-1]}, snapshot_date)"
+                )
+
+    def record(self, tables, date=None, source="", worked_days=None, rest_days=None) -> str:
+        """
+        Store the processed tables ({"AGADIR": DataFrame, "QUALI NV": DataFrame})
+        as the snapshot of source on date (default today), replacing an earlier
+        snapshot of the same day and source. return the snapshot date
+        """
+        date = str(date or datetime.date.today().isoformat())
+        source = source or ""
+        with self._connect() as connection:
+            for name, dataframe in tables.items():
+                if dataframe is None or name not in TABLES:
+                    continue
+                dataframe = _aligned(name, dataframe)
+                columns = [column for column in COLUMNS[name] if column in dataframe.columns]
+                converters = [_text if column in KEYS[name] else _figure for column in columns]
+                rows = [
+                    (date, number, source, worked_days, rest_days)
+                    + tuple(convert(value) for convert, value in zip(converters, values))
+                    for number, values in enumerate(dataframe[columns].itertuples(index=False, name=None))
+                ]
+                table = TABLES[name]
+                names = ["snapshot_date", "row", "source", "worked_days", "rest_days"] + [sql_name(c) for c in columns]
+                connection.execute(f"DELETE FROM {table} WHERE snapshot_date = ? AND source = ?", (date, source))
+                connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", rows
+                )
+        print(f"📚 Snapshot {date} {source or ''}".rstrip() + f" recorded in {self.path}")
+        return date
+
+    def dates(self, table="AGADIR") -> list:
+        """return the snapshot dates, oldest first"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT DISTINCT snapshot_date FROM {TABLES[table]} ORDER BY snapshot_date"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def snapshot(self, date=None, table="AGADIR", source="") -> pd.DataFrame:
+        """return the snapshot of source on date (default the latest) with the sheet's column names"""
+        dates = self.dates(table)
+        date = date or (dates[-1] if dates else None)
+        columns = ", ".join(f'{sql_name(column)} AS "{column}"' for column in COLUMNS[table])
+        with self._connect() as connection:
+            return pd.read_sql_query(
+                f"SELECT {columns} FROM {TABLES[table]} WHERE snapshot_date = ? AND source = ? ORDER BY row",
+                connection, params=(date, source or ""),
+            )
+
+    def trend(self, metric="REAL", table="AGADIR", since=None, until=None, **keys) -> pd.DataFrame:
+        """
+        return metric over time per row, filtered on key columns (or source)
+        given by SQL name, e.g. trend("RAF", vendeur="I03 EL OUAHMI ACHRAF", famille="MGM")
+        """
+        key_columns = [sql_name(column) for column in KEYS[table]]
+        where, params = [], []
+        for key, value in keys.items():
+            if key not in key_columns + ["source"]:
+                raise ValueError(f"{key} is not a key of {table}, use one of {key_columns + ['source']}")
+            where.append(f"{key} = ?")
+            params.append(value)
+        if since:
+            where.append("snapshot_date >= ?")
+            params.append(str(since))
+        if until:
+            where.append("snapshot_date <= ?")
+            params.append(str(until))
+        query = (
+            f"SELECT snapshot_date, source, {', '.join(key_columns)}, {sql_name(metric)} AS \"{metric}\" "
+            f"FROM {TABLES[table]}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY snapshot_date, source, row"
+        )
+        with self._connect() as connection:
+            return pd.read_sql_query(query, connection, params=params)
+
+    def deltas(self, metric="REAL", table="AGADIR", date=None) -> pd.DataFrame:
+        """
+        return metric on date (default the latest snapshot) next to the previous
+        snapshot of the same source, with the change, matched on the key columns
+        """
+        dates = self.dates(table)
+        date = date or (dates[-1] if dates else None)
+        keys = [sql_name(column) for column in KEYS[table]]
+        value = sql_name(metric)
+        # Rows sharing the same keys (e.g. the VIDE subtotals) are matched in sheet order
+        occurrence = f"ROW_NUMBER() OVER (PARTITION BY source, {', '.join(keys)} ORDER BY row) AS occurrence"
+        query = (
+            f"WITH current AS (SELECT *, {occurrence} FROM {TABLES[table]} WHERE snapshot_date = ?), "
+            # The previous snapshot of each source, whatever day it was taken
+            f"previous AS (SELECT *, {occurrence} FROM {TABLES[table]} AS earlier WHERE snapshot_date = "
+            f"(SELECT MAX(snapshot_date) FROM {TABLES[table]} WHERE source = earlier.source AND snapshot_date < ?)) "
+            f"SELECT current.source, {', '.join(f'current.{key}' for key in keys)}, current.{value} AS current, "
+            f"previous.{value} AS previous, current.{value} - previous.{value} AS delta "
+            f"FROM current LEFT JOIN previous ON previous.source = current.source "
+            f"AND previous.occurrence = current.occurrence AND "
+            + " AND ".join(f"previous.{key} IS current.{key}" for key in keys)
+            + " ORDER BY current.source, current.row"
+        )
+        with self._connect() as connection:
+            return pd.read_sql_query(query, connection, params=(date, date))
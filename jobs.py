@@ -0,0 +1,110 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """
+    One background task: its status ("queued", "running", "done" or "failed"),
+    progress in percent with the current stage, and its result or error
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.status = "queued"
+        self.progress = 0
+        self.stage = "Waiting for a worker..."
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def report(self, progress, stage=None):
+        """Called from the task itself to publish its progress"""
+        self.progress = max(0, min(100, int(progress)))
+        if stage:
+            self.stage = stage
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def __repr__(self):
+        return f"Job({self.name!r}, id={self.id}, status={self.status}, progress={self.progress})"
+
+
+class JobQueue:
+    """
+    Runs tasks on a small thread pool so the Streamlit script thread only
+    submits them and polls their status by job id
+    """
+
+    def __init__(self, max_workers=2, keep=100):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Work items submitted to the pool that have not finished yet, counted
+        # apart from _jobs so forgetting a job does not hide its queued work
+        self._active = 0
+        # Finished jobs kept for polling before the oldest are forgotten
+        self.keep = keep
+
+    def submit(self, name, func, *args, **kwargs) -> str:
+        """
+        Queue func(job, *args, **kwargs), the task reports progress through
+        job.report. return the job id
+        """
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._active += 1
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """return the Job for job_id, or None when unknown or forgotten"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        """Number of jobs queued or running, forgotten ones included until they leave the pool"""
+        with self._lock:
+            return self._active
+
+    def forget(self, job_id):
+        """
+        Stop tracking job_id. A queued or running job still runs to the end
+        and counts in pending() until then
+        """
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = "running"
+        job.report(0, "Starting...")
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.report(100, "Done")
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+            print(f"Job {job.name} ({job.id}) failed: {job.error}")
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._active -= 1
+            self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished)
+            for job in finished[:max(0, len(finished) - self.keep)]:
+                del self._jobs[job.id]
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,90 @@
+from openpyxl.utils import column_index_from_string
+from calculations import AGADIR_COLUMNS
+
+
+class SheetLayout:
+    """
+    Where the useful table sits in a source sheet: the header row, the data
+    row ranges, the columns to keep (in output order), the output headers and
+    a few fixed cell values. Compiled once into a column projection and a row
+    filter, then applied in a single pass over the sheet rows.
+    """
+
+    def __init__(self, name, header_row, data_rows, columns, headers, cells=None, drop_from_end=(),
+                 highlight=()):
+        self.name = name
+        self.header_row = header_row
+        # (first, last) source row ranges, last=None means until the end of the sheet
+        self.data_rows = data_rows
+        self.columns = columns
+        # Output header per kept column, None keeps the source header text
+        self.headers = headers
+        # Fixed values written over the output table, e.g. {"A10": "NAME"}
+        self.cells = cells or {}
+        # Output rows removed counting from the last one (1 = last row)
+        self.drop_from_end = drop_from_end
+        # Output header cells filled green on export, e.g. ("F1", "G1")
+        self.highlight = highlight
+        self._indexes = [column_index_from_string(column) - 1 for column in columns]
+        self._last_row = None if any(last is None for _, last in data_rows) else max(last for _, last in data_rows)
+
+    def _keeps(self, number) -> bool:
+        for first, last in self.data_rows:
+            if number >= first and (last is None or number <= last):
+                return True
+        return False
+
+    def _project(self, row):
+        return [row[i] if i < len(row) else None for i in self._indexes]
+
+    def apply(self, rows) -> list:
+        """
+        Turn an iterable of source row tuples (values only) into the output
+        table, header row first, as a list of lists
+        """
+        header = [None] * len(self._indexes)
+        table = []
+        for number, row in enumerate(rows, start=1):
+            if number == self.header_row:
+                header = self._project(row)
+            elif self._keeps(number):
+                table.append(self._project(row))
+            elif self._last_row is not None and number > self._last_row:
+                break
+        for position in sorted(self.drop_from_end, reverse=True):
+            if position <= len(table):
+                del table[len(table) - position]
+        table.insert(0, [new or old for new, old in zip(self.headers, header)])
+        for coordinate, value in self.cells.items():
+            row, column = _cell_position(coordinate)
+            if row <= len(table) and column <= len(self._indexes):
+                table[row - 1][column - 1] = value
+        return table
+
+
+def _cell_position(coordinate):
+    letters = coordinate.rstrip("0123456789")
+    return int(coordinate[len(letters):]), column_index_from_string(letters)
+
+
+AGADIR_LAYOUT = SheetLayout(
+    "AGADIR",
+    header_row=9,
+    data_rows=[(42, 193), (202, 217), (232, None)],
+    columns=["C", "D", "F", "G", "H", "K", "N", "O", "Q", "S", "T"],
+    headers=AGADIR_COLUMNS,
+)
+
+QUALI_LAYOUT = SheetLayout(
+    "QUALI NV",
+    header_row=8,
+    data_rows=[(13, 20), (22, None)],
+    columns=["D", "H", "L", "X", "Y", "Z", "AC", "AD", "AE"],
+    headers=["Vendeur", None, "ACM", None, None, "LINE", "TSM", "RAF TSM", "RAF ACM"],
+    cells={"A21": "CHAKIB ELFIL", "A10": "BOUTMEZGUINE EL MOSTAFA"},
+    # The row just above the footer is dropped
+    drop_from_end=(2,),
+    highlight=("G1", "F1"),
+)
+
+LAYOUTS = [AGADIR_LAYOUT, QUALI_LAYOUT]
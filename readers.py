@@ -0,0 +1,447 @@
+"""
+Source workbook readers. fix_sheet only needs the values of two sheets, so
+besides openpyxl the sheets can be streamed straight out of the XLSX zip
+("xml") or read by calamine when python-calamine is installed ("calamine").
+Pick one with Excel(engine=...) or the EXCEL_READER environment variable, and
+compare them with benchmark.py --engines.
+"""
+import io
+import os
+import posixpath
+import zipfile
+from xml.etree.ElementTree import fromstring, iterparse
+
+from openpyxl import load_workbook
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.worksheet.formula import ArrayFormula, DataTableFormula
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    # Optional, the calamine engine is only available when it is installed
+    CalamineWorkbook = None
+
+
+ENGINES = ("openpyxl", "xml", "calamine")
+DEFAULT_ENGINE = os.environ.get("EXCEL_READER", "openpyxl")
+
+MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIP = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+VALUE = MAIN + "v"
+FORMULA = MAIN + "f"
+PACKAGE_RELATIONSHIP = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
+
+class BufferFile(io.RawIOBase):
+    """
+    Seekable read-only file over a bytes-like object (bytes, bytearray,
+    memoryview), so an upload already in memory is parsed in place instead of
+    being copied or written to a temporary file
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        end = min(self._position + len(target), len(self._view))
+        size = max(0, end - self._position)
+        target[:size] = self._view[self._position:end]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        if base + offset < 0:
+            raise ValueError("negative seek position")
+        self._position = base + offset
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def source_file(source):
+    """
+    return what the readers can open for source: a path as it is, a bytes-like
+    object wrapped in a BufferFile, a file object rewound to its start
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BufferFile(source)
+    source.seek(0)
+    return source
+
+
+def open_workbook(source, engine=None, read_only=True):
+    """
+    Open source (a path, a bytes-like object or a binary file object, see
+    source_file) with engine, DEFAULT_ENGINE by default. Every engine returns a workbook whose sheets, by name, have
+    iter_rows(values_only=True) giving the same rows as openpyxl read-only
+    worksheets. Only openpyxl workbooks can be edited and saved, so full loads
+    (read_only=False) always use openpyxl.
+    """
+    engine = engine or DEFAULT_ENGINE
+    source = source_file(source)
+    if engine == "openpyxl" or not read_only:
+        return load_workbook(source, read_only=read_only)
+    if engine == "xml":
+        return XlsxReader(source)
+    if engine == "calamine":
+        if CalamineWorkbook is None:
+            raise ImportError("The calamine engine needs python-calamine: pip install python-calamine")
+        return CalamineReader(source)
+    raise ValueError(f"Unknown reader engine {engine!r}, use one of {', '.join(ENGINES)}")
+
+
+def available_engines() -> list:
+    """return the engines that can run here"""
+    return [engine for engine in ENGINES if engine != "calamine" or CalamineWorkbook is not None]
+
+
+def _cast_number(value):
+    # Same rule as openpyxl: numbers written with a dot or an exponent are floats
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _text(element):
+    """Plain text of a shared or inline string, rich text runs joined, phonetic runs left out"""
+    snippets = []
+    plain = element.find(MAIN + "t")
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in element.findall(MAIN + "r"):
+        text = run.findtext(MAIN + "t")
+        if text is not None:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _part_path(base, target):
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _relationships(archive, part):
+    """return [(id, type, target path)] of a package part"""
+    directory, name = posixpath.split(part)
+    path = posixpath.join(directory, "_rels", name + ".rels")
+    if path not in archive.namelist():
+        return []
+    root = fromstring(archive.read(path))
+    return [(rel.get("Id"), rel.get("Type", ""), _part_path(part, rel.get("Target", "")))
+            for rel in root.iter(PACKAGE_RELATIONSHIP)]
+
+
+class XlsxReader:
+    """
+    Streams sheet values straight from the sheetN.xml parts of the zip with
+    iterparse, turning cells into values the way openpyxl does (shared strings,
+    numbers, dates from the cell styles, formulas as text) without building
+    cell objects or loading the rest of the workbook
+    """
+
+    def __init__(self, source):
+        self._archive = zipfile.ZipFile(source)
+        workbook = next((target for _, kind, target in _relationships(self._archive, "")
+                         if kind.endswith("/officeDocument")), "xl/workbook.xml")
+        parts = {rel_id: (kind, target) for rel_id, kind, target in _relationships(self._archive, workbook)}
+        root = fromstring(self._archive.read(workbook))
+        properties = root.find(MAIN + "workbookPr")
+        date1904 = properties is not None and properties.get("date1904", "") in ("1", "true")
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        self._sheet_parts = {}
+        for sheet in root.iter(MAIN + "sheet"):
+            kind, target = parts.get(sheet.get(RELATIONSHIP), ("", None))
+            if target is not None and kind.endswith("/worksheet"):
+                self._sheet_parts[sheet.get("name")] = target
+        self.sheetnames = list(self._sheet_parts)
+        self._strings_part = next((target for kind, target in parts.values() if kind.endswith("/sharedStrings")), None)
+        self._styles_part = next((target for kind, target in parts.values() if kind.endswith("/styles")), None)
+        self._shared_strings = None
+        self._formats = None
+
+    def __getitem__(self, name):
+        if name not in self._sheet_parts:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        return XlsxSheet(self, name, self._sheet_parts[name])
+
+    def close(self):
+        self._archive.close()
+
+    def _iter_strings(self):
+        if self._strings_part is None:
+            return
+        with self._archive.open(self._strings_part) as source:
+            for _, element in iterparse(source):
+                if element.tag == MAIN + "si":
+                    yield _text(element).replace("x005F_", "")
+                    element.clear()
+
+    @property
+    def shared_strings(self) -> list:
+        if self._shared_strings is None:
+            self._shared_strings = list(self._iter_strings())
+        return self._shared_strings
+
+    @property
+    def formats(self) -> tuple:
+        """return (date style ids, timedelta style ids) from the cell styles"""
+        if self._formats is None:
+            dates, timedeltas = set(), set()
+            if self._styles_part is not None:
+                root = fromstring(self._archive.read(self._styles_part))
+                number_formats = root.find(MAIN + "numFmts")
+                custom = {int(fmt.get("numFmtId")): fmt.get("formatCode")
+                          for fmt in (number_formats if number_formats is not None else [])}
+                cell_styles = root.find(MAIN + "cellXfs")
+                for style_id, style in enumerate(cell_styles if cell_styles is not None else []):
+                    number = int(style.get("numFmtId", 0))
+                    code = custom[number] if number in custom else BUILTIN_FORMATS.get(number)
+                    if is_date_format(code):
+                        dates.add(style_id)
+                    if is_timedelta_format(code):
+                        timedeltas.add(style_id)
+            self._formats = (dates, timedeltas)
+        return self._formats
+
+
+class XlsxSheet:
+    """One sheet of an XlsxReader, sized from its <dimension> like openpyxl read-only worksheets"""
+
+    def __init__(self, reader, title, part):
+        self.title = title
+        self._reader = reader
+        self._part = part
+        self.min_row = self.min_column = 1
+        self.max_row = self.max_column = None
+        # The <dimension> ref, e.g. "A1:AE300", None when the sheet has none
+        self.dimension = None
+        with reader._archive.open(part) as source:
+            for _, element in iterparse(source, events=("start",)):
+                if element.tag == MAIN + "dimension":
+                    self.dimension = element.get("ref")
+                    self.min_column, self.min_row, self.max_column, self.max_row = range_boundaries(self.dimension)
+                    break
+                if element.tag == MAIN + "sheetData":
+                    break
+
+    def _parse(self, strings=None):
+        """yield (row number, [(column, value)]) for every <row> of the sheet"""
+        strings = self._reader.shared_strings if strings is None else strings
+        dates, timedeltas = self._reader.formats
+        epoch = self._reader.epoch
+        shared_formulae = {}
+        columns = {}
+        row_number = 0
+        with self._reader._archive.open(self._part) as source:
+            for _, element in iterparse(source):
+                if element.tag != MAIN + "row":
+                    continue
+                number = element.get("r")
+                row_number = int(float(number)) if number else row_number + 1
+                cells = []
+                column = 0
+                for cell in element:
+                    reference = cell.get("r")
+                    if reference:
+                        letters = reference.rstrip("0123456789")
+                        column = columns.get(letters) or columns.setdefault(letters, column_index_from_string(letters))
+                    else:
+                        column += 1
+                    kind = cell.get("t", "n")
+                    # One pass over <v> and <f> instead of a find for each
+                    value = formula = None
+                    for child in cell:
+                        if child.tag == VALUE:
+                            if value is None:
+                                value = child.text or None
+                        elif child.tag == FORMULA:
+                            formula = child
+                    if kind == "inlineStr":
+                        value = None
+                    if formula is not None:
+                        value = self._formula(formula, reference, shared_formulae)
+                    elif value is not None:
+                        if kind == "n":
+                            value = _cast_number(value)
+                            style = int(cell.get("s") or 0) if dates else 0
+                            if style in dates:
+                                try:
+                                    value = from_excel(value, epoch, timedelta=style in timedeltas)
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                        elif kind == "s":
+                            value = strings[int(value)]
+                        elif kind == "b":
+                            value = bool(int(value))
+                        elif kind == "d":
+                            value = from_ISO8601(value)
+                    elif kind == "inlineStr":
+                        inline = cell.find(MAIN + "is")
+                        if inline is not None:
+                            value = _text(inline)
+                    cells.append((column, value))
+                yield row_number, cells
+                # Drop the cells already read so memory stays flat on long sheets
+                element.clear()
+
+    def _formula(self, formula, reference, shared_formulae):
+        kind = formula.get("t")
+        value = "=" + (formula.text or "")
+        if kind == "array":
+            return ArrayFormula(ref=formula.get("ref"), text=value)
+        if kind == "shared":
+            index = formula.get("si")
+            if index in shared_formulae:
+                return shared_formulae[index].translate_formula(reference)
+            if value != "=":
+                shared_formulae[index] = Translator(value, reference)
+        elif kind == "dataTable":
+            return DataTableFormula(**formula.attrib)
+        return value
+
+    def cell_value(self, coordinate):
+        """
+        return the value of one cell, e.g. "C6", reading the sheet only down to
+        its row and the shared strings only up to the ones it needs
+        """
+        row, column = coordinate_to_tuple(coordinate)
+        for number, cells in self._parse(_StringTable(self._reader._iter_strings())):
+            if number > row:
+                break
+            if number == row:
+                return next((value for cell_column, value in cells if cell_column == column), None)
+        return None
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=True):
+        """
+        yield row tuples of values between the given bounds (the whole sheet by
+        default), filling missing rows and cells with None like openpyxl
+        """
+        if not values_only:
+            raise ValueError("The xml engine only reads values, use values_only=True")
+        min_col = min_col or 1
+        min_row = min_row or 1
+        max_col = max_col or self.max_column
+        max_row = max_row or self.max_row
+        empty_row = () if max_col is None else (None,) * (max_col + 1 - min_col)
+        counter = min_row
+        number = 1
+        for number, cells in self._parse():
+            if max_row is not None and number > max_row:
+                break
+            for _ in range(counter, number):
+                counter += 1
+                yield empty_row
+            if counter <= number:
+                counter += 1
+                yield self._row(cells, min_col, max_col)
+        if max_row is not None and max_row < number:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+    @staticmethod
+    def _row(cells, min_col, max_col):
+        if not cells and not max_col:
+            return ()
+        max_col = max_col or cells[-1][0]
+        row = [None] * (max_col + 1 - min_col)
+        for column, value in cells:
+            if min_col <= column <= max_col:
+                row[column - min_col] = value
+        return tuple(row)
+
+
+class _StringTable:
+    """Shared strings read from the part only as far as the highest index asked for"""
+
+    def __init__(self, strings):
+        self._strings = strings
+        self._read = []
+
+    def __getitem__(self, index):
+        while len(self._read) <= index:
+            self._read.append(next(self._strings))
+        return self._read[index]
+
+
+def read_metadata(source, sheet="AGADIR", cells=("C6",)) -> dict:
+    """
+    Probe an XLSX (anything source_file takes) without loading any sheet:
+    return {"sheetnames", "dimensions" (name -> ref or None), "cells"
+    (coordinate -> value of sheet)}. Takes milliseconds whatever the size of
+    the file, since only the headers of each sheet part are read.
+    """
+    reader = XlsxReader(source_file(source))
+    try:
+        probed = reader[sheet]
+        sheets = {name: probed if name == sheet else reader[name] for name in reader.sheetnames}
+        return {
+            "sheetnames": reader.sheetnames,
+            "dimensions": {name: worksheet.dimension for name, worksheet in sheets.items()},
+            "cells": {coordinate: probed.cell_value(coordinate) for coordinate in cells},
+        }
+    finally:
+        reader.close()
+
+
+class CalamineReader:
+    """Sheets read by calamine (Rust), rows shaped like openpyxl's"""
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            self._workbook = CalamineWorkbook.from_path(os.fspath(source))
+        else:
+            self._workbook = CalamineWorkbook.from_filelike(source)
+        self.sheetnames = list(self._workbook.sheet_names)
+
+    def __getitem__(self, name):
+        if name not in self.sheetnames:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        return CalamineSheet(self._workbook.get_sheet_by_name(name))
+
+    def close(self):
+        if hasattr(self._workbook, "close"):
+            self._workbook.close()
+
+
+def _calamine_value(value):
+    # calamine gives "" for empty cells and every number as a float
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class CalamineSheet:
+
+    def __init__(self, sheet):
+        self.title = sheet.name
+        self._sheet = sheet
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=True):
+        """yield row tuples of values between the given bounds, the whole sheet by default"""
+        if not values_only:
+            raise ValueError("The calamine engine only reads values, use values_only=True")
+        rows = self._sheet.to_python(skip_empty_area=False)
+        width = max([len(row) for row in rows] + [0])
+        min_col = min_col or 1
+        max_col = max_col or width
+        for row in rows[(min_row or 1) - 1:max_row]:
+            values = [_calamine_value(value) for value in row[min_col - 1:max_col]]
+            yield tuple(values + [None] * (max_col + 1 - min_col - len(values)))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP conversion service for automated exports, no Streamlit needed.
+
+    python server.py --port 8000 --workers 2 --queue 8
+
+    curl --data-binary @export.xlsx "localhost:8000/jobs?rest_days=16"   # 202 {"id": ...}
+    curl localhost:8000/jobs/<id>                                        # status and progress
+    curl "localhost:8000/jobs/<id>/result?format=csv&sheet=QUALI NV"     # json (default), csv or xlsx
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cache import ResultCache
+from excel import Excel
+from jobs import JobQueue
+from readers import DEFAULT_ENGINE, ENGINES
+
+
+# Uploads above this size are refused with 413
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+SHEETS = ("AGADIR", "QUALI NV")
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def convert(job, data, digest, jour_rest, engine, cache):
+    """
+    Job: process the uploaded workbook bytes in place, with rest days
+    defaulting to 24 - work days like the app. return the processor
+    """
+    processor = Excel(data, read_only=True, cache=cache, digest=digest, output_path=None,
+                      progress=job.report, engine=engine)
+    work_days, _ = processor.get_day_work()
+    if jour_rest is None:
+        jour_rest = 24 - work_days
+    processor.fix_sheet(jour_rest=jour_rest)
+    processor.rest_days = jour_rest
+    processor.progress = None
+    # The tables are in memory now, the upload itself is no longer needed
+    processor.path = None
+    return processor
+
+
+class ConversionService:
+    """
+    The jobs behind the HTTP API: at most workers conversions run at once and
+    at most queue more wait for a worker, later uploads are refused (503) until
+    some finish
+    """
+
+    def __init__(self, workers=2, queue=8, engine=DEFAULT_ENGINE, keep=32):
+        self.jobs = JobQueue(max_workers=workers, keep=keep)
+        self.cache = ResultCache(max_entries=16)
+        self.capacity = workers + queue
+        self.engine = engine
+        self._lock = threading.Lock()
+
+    def full(self) -> bool:
+        return self.jobs.pending() >= self.capacity
+
+    def submit(self, data, jour_rest=None):
+        """return the job id, or None when the queue is full"""
+        with self._lock:
+            if self.full():
+                return None
+            digest = hashlib.sha256(data).hexdigest()
+            return self.jobs.submit("convert", convert, data, digest, jour_rest, self.engine, self.cache)
+
+    def status(self, job) -> dict:
+        status = {"id": job.id, "status": job.status, "progress": job.progress, "stage": job.stage,
+                  "error": job.error}
+        if job.status == "done":
+            processor = job.result
+            status.update(work_days=processor.days.worked, total_days=processor.days.total,
+                          rest_days=processor.rest_days,
+                          rows={"AGADIR": len(processor.agadir), "QUALI NV": len(processor.quali_nv)})
+        return status
+
+
+def tables_of(processor) -> dict:
+    return {"AGADIR": processor.agadir, "QUALI NV": processor.quali_nv}
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    server_version = "ExcelConverter/1.0"
+
+    @property
+    def service(self) -> ConversionService:
+        return self.server.service
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, default=str)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send(status, {"error": message}, headers=headers)
+
+    def _busy(self):
+        self.close_connection = True
+        return self._error(503, "Too many conversions queued, retry later", headers={"Retry-After": "5"})
+
+    def _route(self):
+        """return (job or None, rest of the path, query) for /jobs/<id>[/result] paths"""
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if len(parts) >= 2 and parts[0] == "jobs":
+            return self.service.jobs.get(parts[1]), parts[2:], query
+        return None, parts, query
+
+    def do_GET(self):
+        job, rest, query = self._route()
+        if rest == ["health"]:
+            return self._send(200, {"status": "ok", "pending": self.service.jobs.pending(),
+                                    "capacity": self.service.capacity, "engine": self.service.engine})
+        if job is None:
+            return self._error(404, "Unknown job")
+        if not rest:
+            return self._send(200, self.service.status(job))
+        if rest != ["result"]:
+            return self._error(404, "Not found")
+        if not job.done:
+            return self._error(409, f"Job is {job.status}", headers={"Retry-After": "1"})
+        if job.status == "failed":
+            return self._error(422, job.error)
+
+        output = query.get("format", "json")
+        tables = tables_of(job.result)
+        if output == "json":
+            # to_json turns NaN into null and dates into ISO strings
+            body = "{" + ", ".join(f"{json.dumps(name)}: {table.to_json(orient='records', date_format='iso')}"
+                                   for name, table in tables.items()) + "}"
+            return self._send(200, body)
+        if output == "csv":
+            sheet = query.get("sheet", "AGADIR")
+            if sheet not in tables:
+                return self._error(400, f"sheet must be one of {', '.join(SHEETS)}")
+            return self._send(200, tables[sheet].to_csv(index=False), "text/csv; charset=utf-8")
+        if output == "xlsx":
+            return self._send(200, job.result.output, XLSX_TYPE,
+                              headers={"Content-Disposition": 'attachment; filename="finale_jour.xlsx"'})
+        return self._error(400, "format must be json, csv or xlsx")
+
+    def do_POST(self):
+        job, rest, query = self._route()
+        if rest != ["jobs"]:
+            return self._error(404, "Not found")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            jour_rest = int(query["rest_days"]) if "rest_days" in query else None
+        except ValueError:
+            return self._error(400, "Content-Length and rest_days must be integers")
+        if length <= 0:
+            return self._error(411, "Send the .xlsx file as the request body")
+        if length > MAX_UPLOAD_BYTES:
+            return self._error(413, f"Uploads are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        # Refuse before reading the body, submit checks again once it is read
+        if self.service.full():
+            return self._busy()
+        data = self.rfile.read(length)
+        job_id = self.service.submit(data, jour_rest)
+        if job_id is None:
+            return self._busy()
+        return self._send(202, {"id": job_id, "status": f"/jobs/{job_id}", "result": f"/jobs/{job_id}/result"},
+                          headers={"Location": f"/jobs/{job_id}"})
+
+    def do_DELETE(self):
+        job, rest, query = self._route()
+        if job is None or rest:
+            return self._error(404, "Unknown job")
+        if not job.done:
+            # Its work item stays in the pool either way, so it keeps its place in the capacity
+            return self._error(409, f"Job is {job.status}, delete it once it is done", headers={"Retry-After": "1"})
+        self.service.jobs.forget(job.id)
+        return self._send(200, {"id": job.id, "forgotten": True})
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def make_server(host="127.0.0.1", port=8000, workers=2, queue=8, engine=DEFAULT_ENGINE) -> ThreadingHTTPServer:
+    """return the HTTP server (not started yet), port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), ConversionHandler)
+    server.service = ConversionService(workers=workers, queue=queue, engine=engine)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API converting AGADIR/QUALI NV workbooks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2, help="Conversions running at once")
+    parser.add_argument("--queue", type=int, default=8, help="Conversions waiting for a worker before 503s")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE, help="Reader of the uploaded workbooks")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.workers, args.queue, args.engine)
+    print(f"🚀 Listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.jobs.shutdown(wait=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+import os
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    # Without pyarrow the tables are stored as pickles, still far faster than XLSX
+    feather = None
+
+
+# Arrow columns hold a single type, so a column mixing numbers and text
+# (e.g. the "%" rows of AGADIR) is stored as its numbers plus "<name> (text)"
+TEXT_SUFFIX = " (text)"
+
+
+def tables_dir_for(output_path) -> str:
+    """Where the tables of a processed output file are stored: excel/finale_jour.xlsx -> excel/finale_jour_tables"""
+    return os.path.splitext(output_path)[0] + "_tables"
+
+
+def _table_file(directory, name, extension):
+    return os.path.join(directory, f"{name}.{extension}")
+
+
+def _arrow_compatible(dataframe) -> bool:
+    """
+    Feather needs unique string column names, QUALI NV keeps some source headers
+    as they are, so an empty (None) or repeated header cell rules it out
+    """
+    names = list(dataframe.columns)
+    return (all(isinstance(name, str) for name in names) and len(set(names)) == len(names)
+            and not any(name + TEXT_SUFFIX in names for name in names))
+
+
+def _to_arrow_frame(dataframe) -> pd.DataFrame:
+    columns = {}
+    for name in dataframe.columns:
+        column = dataframe[name]
+        if column.dtype == object:
+            is_text = column.map(lambda value: isinstance(value, str))
+            is_number = column.notna() & ~is_text
+            if is_text.any() and is_number.any():
+                columns[name] = pd.to_numeric(column.where(is_number), errors="coerce")
+                columns[name + TEXT_SUFFIX] = column.where(is_text, None)
+                continue
+            if is_number.any():
+                column = pd.to_numeric(column, errors="coerce")
+        columns[name] = column
+    return pd.DataFrame(columns)
+
+
+def _from_arrow_frame(dataframe) -> pd.DataFrame:
+    columns = {}
+    for name in dataframe.columns:
+        if name.endswith(TEXT_SUFFIX):
+            continue
+        column = dataframe[name]
+        text = name + TEXT_SUFFIX
+        if text in dataframe.columns:
+            # Whole numbers go back to int like the cells they came from
+            numbers = pd.Series([int(value) if pd.notna(value) and value == int(value) else value
+                                 for value in column], index=column.index, dtype=object)
+            column = dataframe[text].astype(object).where(dataframe[text].notna(), numbers)
+        columns[name] = column
+    return pd.DataFrame(columns)
+
+
+def save_tables(directory, tables):
+    """
+    Store processed tables ({sheet name: DataFrame}) in directory, one Feather
+    file per table (a pickle when pyarrow is not installed or the column names
+    can't go to Feather, see _arrow_compatible)
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, dataframe in tables.items():
+        if feather is not None and _arrow_compatible(dataframe):
+            path, stale = _table_file(directory, name, "feather"), _table_file(directory, name, "pkl")
+            feather.write_feather(_to_arrow_frame(dataframe), path)
+        else:
+            path, stale = _table_file(directory, name, "pkl"), _table_file(directory, name, "feather")
+            dataframe.to_pickle(path)
+        # A table saved in the other format before must not shadow this one
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def load_table(directory, name):
+    """
+    return the stored table name from directory (memory mapped Feather, else
+    pickle), or None when it was never stored
+    """
+    path = _table_file(directory, name, "feather")
+    if feather is not None and os.path.exists(path):
+        return _from_arrow_frame(feather.read_feather(path, memory_map=True))
+    path = _table_file(directory, name, "pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    return None
+
+
+def load_tables(directory, names=("AGADIR", "QUALI NV")) -> dict:
+    """return {name: DataFrame} for the stored tables among names"""
+    tables = {name: load_table(directory, name) for name in names}
+    return {name: table for name, table in tables.items() if table is not None}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for batch processing across a process pool
+"""
+
+import pandas as pd
+
+from batch import collect_workbooks, main, process_batch
+from benchmark import make_workbook
+from history import HistoryStore
+
+
+def make_exports(directory):
+    make_workbook(str(directory / "agadir.xlsx"), vendors=2, extra_sheets=0)
+    make_workbook(str(directory / "tiznit.xlsx"), vendors=3, extra_sheets=0)
+    (directory / "broken.xlsx").write_bytes(b"not a workbook")
+    # Excel lock files are skipped
+    (directory / "~$agadir.xlsx").write_bytes(b"")
+
+
+def test_failed_files_are_reported_with_the_others(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    make_exports(exports)
+    assert [path.rsplit("/", 1)[-1] for path in collect_workbooks([str(exports)])] == \
+           ["agadir.xlsx", "broken.xlsx", "tiznit.xlsx"]
+
+    summary = process_batch([str(exports)], str(tmp_path / "out"), workers=2, engine="xml")
+    assert summary["file"].str.rsplit("/", n=1).str[-1].tolist() == ["agadir.xlsx", "broken.xlsx", "tiznit.xlsx"]
+    assert summary["status"].tolist() == ["ok", "failed", "ok"]
+    assert summary["error"][1].startswith("BadZipFile")
+    assert summary["agadir_rows"][0] == 16 and summary["agadir_rows"][2] == 24
+    # Rest days default to 24 - work days of each file
+    assert summary["rest_days"][0] == 16
+    assert (tmp_path / "out" / "agadir_finale_jour.xlsx").exists()
+
+
+def test_cli_writes_the_summary_and_history(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    make_exports(exports)
+    output_dir = tmp_path / "out"
+    history_path = str(tmp_path / "history.sqlite")
+    status = main([str(exports), "--output-dir", str(output_dir), "--rest-days", "10", "--workers", "1",
+                   "--history", history_path, "--engine", "openpyxl"])
+    # One file failed, so the exit status says so
+    assert status == 1
+
+    summary = pd.read_csv(output_dir / "summary.csv")
+    assert summary["status"].tolist() == ["ok", "failed", "ok"]
+    assert summary["rest_days"].tolist()[::2] == [10, 10]
+
+    history = HistoryStore(history_path)
+    assert len(history.snapshot(source="agadir")) == 16
+    assert len(history.snapshot(source="tiznit")) == 24
+    assert history.snapshot(source="broken").empty
+
+
+def test_same_file_names_in_different_directories_are_kept_apart(tmp_path):
+    for region in ("north", "south"):
+        (tmp_path / region).mkdir()
+        make_workbook(str(tmp_path / region / "export.xlsx"), vendors=2 if region == "north" else 3,
+                      extra_sheets=0)
+    output_dir = tmp_path / "out"
+    summary = process_batch([str(tmp_path / "north"), str(tmp_path / "south")], str(output_dir), workers=1)
+    assert summary["status"].tolist() == ["ok", "ok"]
+    assert summary["output"].tolist() == [str(output_dir / "north" / "export_finale_jour.xlsx"),
+                                          str(output_dir / "south" / "export_finale_jour.xlsx")]
+    assert summary["agadir_rows"].tolist() == [16, 24]
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_failed_files_are_reported_with_the_others(Path(tempfile.mkdtemp()))
+    test_cli_writes_the_summary_and_history(Path(tempfile.mkdtemp()))
+    test_same_file_names_in_different_directories_are_kept_apart(Path(tempfile.mkdtemp()))
+    print("✅ batch tests passed")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test script for the benchmark harness and its synthetic workbooks
+"""
+
+import pandas as pd
+
+from benchmark import benchmark_file, make_workbook, regressions
+from excel import Excel
+
+
+def test_synthetic_workbook_goes_through_the_pipeline(tmp_path):
+    # 25 vendors fill all three AGADIR data ranges
+    path = make_workbook(str(tmp_path / "bench.xlsx"), vendors=25, extra_sheets=0)
+    processor = Excel(path, read_only=True, output_path=None)
+    assert processor.get_day_work() == (8, 24)
+    processor.fix_sheet(jour_rest=16)
+    assert len(processor.agadir) == 25 * 8
+    assert processor.agadir["Famille"].iloc[-1] == "C.A (ht)"
+
+
+def test_every_stage_is_measured(tmp_path):
+    path = make_workbook(str(tmp_path / "bench.xlsx"), vendors=2, extra_sheets=0)
+    rows = benchmark_file(path, repeat=1)
+    assert [row["stage"] for row in rows] == [
+        "load", "day_work", "reshape", "compute", "save", "read_output", "upload_payload", "fix_sheet",
+    ]
+    assert all(row["seconds"] >= 0 and row["peak_mb"] >= 0 for row in rows)
+
+
+def test_regressions_ignore_noise():
+    baseline = pd.DataFrame([{"vendors": 21, "stage": "save", "seconds": 0.01},
+                             {"vendors": 300, "stage": "save", "seconds": 0.5}])
+    results = pd.DataFrame([{"vendors": 21, "stage": "save", "seconds": 0.02},
+                            {"vendors": 300, "stage": "save", "seconds": 0.9}])
+    assert regressions(results, baseline)["vendors"].tolist() == [300]
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_synthetic_workbook_goes_through_the_pipeline(Path(tempfile.mkdtemp()))
+    test_every_stage_is_measured(Path(tempfile.mkdtemp()))
+    test_regressions_ignore_noise()
+    print("✅ benchmark tests passed")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized AGADIR and QUALI NV calculations, checked
+against the per-cell formulas fix_sheet used to run on the worksheet
+"""
+
+import pandas as pd
+import pytest
+
+from calculations import AGADIR_COLUMNS, QUALI_COLUMNS, compute_agadir, compute_quali
+
+
+def is_number(value):
+    return isinstance(value, (int, float))
+
+
+def reference_agadir(rows, day_work, worked_days, jour_rest):
+    """The cell by cell AGADIR formulas, one row at a time"""
+    result = []
+    for row in rows:
+        row = dict(zip(AGADIR_COLUMNS, row))
+        if is_number(row["REAL"]) and is_number(row["EnCours"]):
+            row["REAL"] = row["REAL"] + row["EnCours"]
+        real, obj = row["REAL"], row["OBJ"]
+        row["Percent"] = real / obj - 1 if is_number(real) and is_number(obj) and obj != 0 else None
+        row["OBJ MOIS"] = obj * day_work / worked_days if is_number(obj) else None
+        obj_mois = row["OBJ MOIS"]
+        row["RAF"] = (obj_mois - real) / jour_rest if is_number(obj_mois) and is_number(real) and jour_rest else None
+        for name in ["REAL", "OBJ", "OBJ MOIS", "RAF", "REAL 2025", "H 2024", "EnCours"]:
+            if is_number(row[name]):
+                row[name] = int(row[name])
+        result.append([row[name] for name in AGADIR_COLUMNS])
+    return result
+
+
+def reference_quali(rows, jour_rest):
+    result = []
+    for row in rows:
+        row = dict(zip(QUALI_COLUMNS, row))
+        clients = row["CLT PROGRAMME"]
+        for ratio, target in [("TSM", "RAF TSM"), ("ACM", "RAF ACM")]:
+            if is_number(row[ratio]) and is_number(clients) and jour_rest:
+                row[target] = int((clients - clients * row[ratio]) / jour_rest)
+            else:
+                row[target] = None
+        result.append([row[name] for name in QUALI_COLUMNS])
+    return result
+
+
+AGADIR_ROWS = [
+    # Vendeur, Famille, REAL, OBJ, Percent, REAL 2025, H 2024, H %, EnCours, OBJ MOIS, RAF
+    ["A", "MGM", 100, 250, None, 90.7, 80, 0.1, 20, None, None],
+    # REAL above OBJ MOIS: RAF is negative and truncated toward zero
+    ["A", "SAUCES", 900.5, 300, None, 12, None, None, 7.25, None, None],
+    # "%" marker cells and text in the number columns
+    ["A", "C.A (ht)", "%", 120, "%", "%", "-", "%", 3, None, None],
+    ["B", "MGM", 40, 0, None, 1, 2, None, "n/a", None, None],
+    ["B", "VIDE", None, None, None, None, None, None, None, None, None],
+    ["B", "DIVERS", 15, "objectif", None, 3, 4, None, None, None, None],
+]
+QUALI_ROWS = [
+    # Vendeur, CLT PROGRAMME, ACM, Moy L/BL, Obj L/BL, LINE, TSM, RAF TSM, RAF ACM
+    ["A", 120, 0.35, 4.5, 5, 10, 0.8, None, None],
+    ["B", 80, 1.25, 3, 5, 8, "%", None, None],
+    ["C", "-", 0.5, 3, 5, 8, 0.5, None, None],
+    ["D", 33, 0.1, None, None, None, 0.95, None, None],
+]
+
+
+def frame(rows, columns):
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+def values(table):
+    # NaN-free object values compare exactly, types included
+    return [[None if value is None or value != value else value for value in row] for row in table.values.tolist()]
+
+
+def types(rows):
+    return [[type(value) for value in row] for row in rows]
+
+
+@pytest.mark.parametrize("jour_rest", [16, 3, None, 0])
+def test_agadir_matches_the_cell_formulas(jour_rest):
+    actual = values(compute_agadir(frame(AGADIR_ROWS, AGADIR_COLUMNS), 24, 8, jour_rest))
+    expected = reference_agadir(AGADIR_ROWS, 24, 8, jour_rest)
+    assert actual == expected
+    assert types(actual) == types(expected)
+
+
+def test_agadir_spot_values():
+    table = compute_agadir(frame(AGADIR_ROWS, AGADIR_COLUMNS), 24, 8, 16)
+    # REAL + EnCours, Percent, OBJ MOIS = OBJ * 24 / 8, RAF = int((750 - 120) / 16)
+    assert table.loc[0, ["REAL", "Percent", "OBJ MOIS", "RAF"]].tolist() == [120, 120 / 250 - 1, 750, 39]
+    # int((900 - 907.75) / 16) rounds toward zero, not down
+    assert table.loc[1, "RAF"] == 0
+    assert table.loc[1, "REAL"] == 907
+    # int((0 - 40) / 16) is -2, not -3
+    assert table.loc[3, "RAF"] == -2
+    # No Percent for "%" cells or when OBJ is 0
+    assert table.loc[2, "Percent"] is None and table.loc[3, "Percent"] is None
+    assert table.loc[2, "REAL"] == "%" and table.loc[2, "RAF"] is None
+    assert table.loc[5, ["OBJ MOIS", "RAF"]].tolist() == [None, None]
+
+
+def test_agadir_without_worked_days_fails():
+    with pytest.raises(ZeroDivisionError):
+        compute_agadir(frame(AGADIR_ROWS, AGADIR_COLUMNS), 24, 0, 16)
+
+
+@pytest.mark.parametrize("jour_rest", [16, 7, None, 0])
+def test_quali_matches_the_cell_formulas(jour_rest):
+    actual = values(compute_quali(frame(QUALI_ROWS, QUALI_COLUMNS), jour_rest))
+    expected = reference_quali(QUALI_ROWS, jour_rest)
+    assert actual == expected
+    assert types(actual) == types(expected)
+    if jour_rest == 16:
+        # RAF TSM = int((120 - 96) / 16), RAF ACM = int((80 - 100) / 16) toward zero
+        assert actual[0][7] == 1 and actual[1][8] == -1
+
+
+if __name__ == "__main__":
+    for jour_rest in (16, 3, None, 0):
+        test_agadir_matches_the_cell_formulas(jour_rest)
+        test_quali_matches_the_cell_formulas(jour_rest)
+    test_agadir_spot_values()
+    test_agadir_without_worked_days_fails()
+    print("✅ calculation tests passed")
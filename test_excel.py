@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the Excel processor tables
+"""
+
+import io
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from benchmark import make_workbook
+from cache import ResultCache
+from excel import Excel
+
+
+def test_quali_headers_match_read_excel(tmp_path):
+    path = str(tmp_path / "source.xlsx")
+    make_workbook(path, vendors=3, extra_sheets=0)
+    # QUALI NV keeps some source headers: one left empty, two repeated
+    wb = load_workbook(path)
+    wb["QUALI NV"]["H8"] = None
+    wb["QUALI NV"]["X8"] = "Moy L/BL"
+    wb["QUALI NV"]["Y8"] = "Moy L/BL"
+    wb.save(path)
+
+    processor = Excel(path, read_only=True, output_path=None)
+    processor.get_day_work()
+    processor.fix_sheet(jour_rest=16)
+    quali = processor.get_quali_nv_dataframe()
+    assert list(quali.columns)[:5] == ["Vendeur", "Unnamed: 1", "ACM", "Moy L/BL", "Moy L/BL.1"]
+
+    # Same frames as reading the exported file back
+    for name, table in (("QUALI NV", quali), ("AGADIR", processor.agadir)):
+        expected = pd.read_excel(io.BytesIO(processor.output), sheet_name=name)
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+
+
+def processed(path, jour_rest, **kwargs):
+    processor = Excel(path, read_only=True, output_path=None, **kwargs)
+    processor.get_day_work()
+    processor.fix_sheet(jour_rest=jour_rest)
+    return processor
+
+
+def sheet_values(output):
+    wb = load_workbook(io.BytesIO(output))
+    return {name: list(wb[name].iter_rows(values_only=True)) for name in wb.sheetnames}
+
+
+def test_rest_days_change_only_recomputes_raf(tmp_path):
+    path = make_workbook(str(tmp_path / "source.xlsx"), vendors=5, extra_sheets=0)
+    cache = ResultCache()
+    processor = processed(path, 16, cache=cache)
+
+    def not_again(*args):
+        raise AssertionError("the source was read again")
+
+    # Same processor, as in the app, and a new one sharing the cache, as in another session
+    other = Excel(path, read_only=True, output_path=None, cache=cache)
+    other.get_day_work()
+    for recomputed in (processor, other):
+        recomputed.load = recomputed._reshape = not_again
+        for jour_rest in (10, 0, None):
+            recomputed.fix_sheet(jour_rest=jour_rest)
+            fresh = processed(path, jour_rest)
+            pd.testing.assert_frame_equal(recomputed.agadir, fresh.agadir)
+            pd.testing.assert_frame_equal(recomputed.quali_nv, fresh.quali_nv)
+            assert sheet_values(recomputed.output) == sheet_values(fresh.output)
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_quali_headers_match_read_excel(Path(tempfile.mkdtemp()))
+    test_rest_days_change_only_recomputes_raf(Path(tempfile.mkdtemp()))
+    print("✅ Excel processor tests passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the XLSX export of the processed tables
+"""
+
+import io
+
+from openpyxl import Workbook, load_workbook
+
+from exporter import export_tables
+from layout import AGADIR_LAYOUT, QUALI_LAYOUT
+
+AGADIR_ROWS = [
+    ["Vendeur", "Famille", "REAL", "OBJ", "Percent", "REAL 2025", "H 2024", "H %", "EnCours", "OBJ MOIS", "RAF"],
+    ["A", "MGM", 120, 250, -0.52, 90, 80, 0.1, 20, 750, 39],
+    ["A", "C.A (ht)", "%", 120, None, "%", None, "%", 3, 360, None],
+]
+QUALI_ROWS = [
+    ["Vendeur", "CLT PROGRAMME", "ACM", "Moy L/BL", "Obj L/BL", "LINE", "TSM", "RAF TSM", "RAF ACM"],
+    ["A", 120, 0.35, 4.5, 5, 10, 0.8, 1, 4],
+]
+TABLES = [(AGADIR_LAYOUT, AGADIR_ROWS), (QUALI_LAYOUT, QUALI_ROWS)]
+# REAL, OBJ, REAL 2025, H 2024, EnCours, OBJ MOIS, RAF and RAF TSM, RAF ACM
+INT_CELLS = {"AGADIR": ["C2", "D2", "F2", "G2", "I2", "J2", "K2"], "QUALI NV": ["H2", "I2"]}
+
+
+def check_export(output, sheetnames):
+    wb = load_workbook(io.BytesIO(output))
+    assert wb.sheetnames == sheetnames
+    for layout, rows in TABLES:
+        sheet = wb[layout.name]
+        assert [list(row) for row in sheet.iter_rows(values_only=True)] == rows
+        # Whole numbers stay integers, not floats
+        assert all(type(sheet[coordinate].value) is int for coordinate in INT_CELLS[layout.name])
+        for coordinate in ("F1", "G1"):
+            fill = sheet[coordinate].fill
+            highlighted = coordinate in layout.highlight
+            assert (fill.fill_type == "solid") is highlighted
+            if highlighted:
+                assert fill.fgColor.rgb.lower().endswith("4cbb17")
+
+
+def test_write_only_export():
+    check_export(export_tables(TABLES), ["AGADIR", "QUALI NV"])
+
+
+def test_export_into_the_source_workbook():
+    # The tables replace their sheets in place, the other sheets are kept
+    source = Workbook()
+    source.active.title = "INTRO"
+    for name in ("AGADIR", "QUALI NV", "EXTRA"):
+        source.create_sheet(name)["A1"] = "source"
+    check_export(export_tables(TABLES, workbook=source), ["INTRO", "AGADIR", "QUALI NV", "EXTRA"])
+
+
+if __name__ == "__main__":
+    test_write_only_export()
+    test_export_into_the_source_workbook()
+    print("✅ exporter tests passed")
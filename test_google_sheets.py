@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test script for the Google Sheets service against fake gspread objects
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from gspread.exceptions import APIError
+
+import google_sheets
+from google_sheets import GoogleSheetsService, clear_client_cache, with_retry
+
+
+class FakeWorksheet:
+    def __init__(self, title, sheet_id, rows=1000, columns=26):
+        self.title = title
+        self.id = sheet_id
+        self.row_count = rows
+        self.col_count = columns
+
+
+class FakeSpreadsheet:
+    """Records the Sheets API calls made through it, in order"""
+
+    def __init__(self, worksheets, spreadsheet_id="sheet-1", fail_updates=()):
+        self.id = spreadsheet_id
+        self._worksheets = worksheets
+        self.calls = []
+        self.updates = 0
+        # Numbers (1-based) of the values:batchUpdate calls that raise
+        self.fail_updates = set(fail_updates)
+
+    def worksheets(self):
+        self.calls.append(("worksheets",))
+        return self._worksheets
+
+    def batch_update(self, body):
+        self.calls.append(("batch_update", body))
+
+    def values_batch_clear(self, body):
+        self.calls.append(("values_batch_clear", body))
+
+    def values_batch_update(self, body):
+        self.calls.append(("values_batch_update", body))
+        self.updates += 1
+        if self.updates in self.fail_updates:
+            raise ConnectionAbortedError("connection dropped")
+
+    def call_names(self):
+        return [call[0] for call in self.calls]
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "fake", "status": "FAKE"}}
+
+
+def failing(*statuses, headers=None):
+    """A call raising APIError with each status in turn, then returning "ok" """
+    errors = [APIError(FakeResponse(status, headers)) for status in statuses]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return call
+
+
+def account(key_id="key-1", email="bot@project.iam.gserviceaccount.com"):
+    return {"type": "service_account", "project_id": "project", "private_key": "secret",
+            "client_email": email, "private_key_id": key_id, "token_uri": "https://oauth2.googleapis.com/token"}
+
+
+def test_clients_are_shared_per_service_account(monkeypatch):
+    authorized = []
+    monkeypatch.setattr(google_sheets.Credentials, "from_service_account_info",
+                        lambda info, scopes: ("credentials", info["private_key_id"]))
+    monkeypatch.setattr(google_sheets.gspread, "authorize", lambda credentials: authorized.append(credentials) or object())
+    clear_client_cache()
+    try:
+        first, second, rotated = GoogleSheetsService(), GoogleSheetsService(), GoogleSheetsService()
+        assert first.authenticate_with_service_account(account())
+        assert second.authenticate_with_service_account(account())
+        # Same service account: one token exchange, one client, one spreadsheet cache
+        assert second.client is first.client and second._spreadsheets is first._spreadsheets
+        assert rotated.authenticate_with_service_account(account(key_id="key-2"))
+        assert rotated.client is not first.client
+        assert authorized == [("credentials", "key-1"), ("credentials", "key-2")]
+    finally:
+        clear_client_cache()
+
+
+def test_upload_is_one_batched_request_sequence():
+    spreadsheet = FakeSpreadsheet([FakeWorksheet("Suivi Test", 1), FakeWorksheet("small", 2, rows=2, columns=2)])
+    uploads = {
+        "suivi test": pd.DataFrame({"Vendeur": ["A", "B"], "RAF": [1, None]}),
+        "Small": pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6], "c": [7, 8, 9]}),
+        "New": pd.DataFrame({"x": range(5)}),
+    }
+    assert GoogleSheetsService().upload_dataframes_to_sheets(spreadsheet, uploads)
+    assert spreadsheet.call_names() == ["worksheets", "batch_update", "values_batch_clear", "values_batch_update"]
+
+    # The missing worksheet is added at its data size and the small one grown, in one request
+    changes = spreadsheet.calls[1][1]["requests"]
+    assert changes == [
+        {"updateSheetProperties": {
+            "properties": {"sheetId": 2, "gridProperties": {"rowCount": 4, "columnCount": 3}},
+            "fields": "gridProperties.rowCount,gridProperties.columnCount",
+        }},
+        {"addSheet": {"properties": {"title": "New", "gridProperties": {"rowCount": 6, "columnCount": 1}}}},
+    ]
+    # Only existing worksheets are cleared, titles matched case-insensitively
+    assert spreadsheet.calls[2][1] == {"ranges": ["'Suivi Test'", "'small'"]}
+    data = spreadsheet.calls[3][1]["data"]
+    assert [entry["range"] for entry in data] == ["'Suivi Test'!A1", "'small'!A1", "'New'!A1"]
+    assert data[0]["values"] == [["Vendeur", "RAF"], ["A", 1.0], ["B", ""]]
+
+
+def test_retry_waits_out_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(google_sheets.time, "sleep", sleeps.append)
+    monkeypatch.setattr(google_sheets.random, "uniform", lambda low, high: 0.5)
+    assert with_retry(failing(429, 503, headers={"Retry-After": "30"})) == "ok"
+    # Retry-After beats the shorter backoff (1.5s, 2.5s)
+    assert sleeps == [30.0, 30.0]
+
+    sleeps.clear()
+    assert with_retry(failing(500, 500)) == "ok"
+    assert sleeps == [1.5, 2.5]
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(google_sheets.time, "sleep", sleeps.append)
+    for status in (400, 403, 404):
+        with pytest.raises(APIError):
+            with_retry(failing(status))
+    assert sleeps == []
+    # Rate limits give up after RETRY_ATTEMPTS tries
+    with pytest.raises(APIError):
+        with_retry(failing(*[429] * google_sheets.RETRY_ATTEMPTS))
+    assert len(sleeps) == google_sheets.RETRY_ATTEMPTS - 1
+
+
+def test_failed_upload_resumes_after_the_last_sent_chunk(monkeypatch):
+    # 10 rows of 1 column in chunks of 4 cells: 3 values:batchUpdate calls
+    monkeypatch.setattr(google_sheets, "UPLOAD_CHUNK_CELLS", 4)
+    uploads = {"Suivi Test": pd.DataFrame({"RAF": range(9)})}
+    service = GoogleSheetsService()
+
+    spreadsheet = FakeSpreadsheet([FakeWorksheet("Suivi Test", 1)], fail_updates=(2,))
+    assert not service.upload_dataframes_to_sheets(spreadsheet, uploads)
+    assert spreadsheet.call_names() == ["worksheets", "values_batch_clear", "values_batch_update", "values_batch_update"]
+
+    # Pushing the same data again skips the clear and the chunk already sent
+    spreadsheet.calls.clear()
+    assert service.upload_dataframes_to_sheets(spreadsheet, uploads)
+    assert spreadsheet.call_names() == ["worksheets", "values_batch_update", "values_batch_update"]
+    sent = [entry["range"] for call in spreadsheet.calls[1:] for entry in call[1]["data"]]
+    assert sent == ["'Suivi Test'!A5", "'Suivi Test'!A9"]
+
+    # Once complete, the checkpoint is gone and a new push starts over
+    spreadsheet.calls.clear()
+    assert service.upload_dataframes_to_sheets(spreadsheet, uploads)
+    assert spreadsheet.call_names()[:2] == ["worksheets", "values_batch_clear"]
+    assert len(spreadsheet.calls) == 5
+
+
+def test_publish_fans_out_and_reports_partial_failures(monkeypatch):
+    routes = [
+        {"sheet": "AGADIR", "spreadsheet_id": "north", "worksheet": "Suivi"},
+        {"sheet": "QUALI NV", "spreadsheet_id": "north", "worksheet": "Quali"},
+        {"sheet": "AGADIR", "spreadsheet_id": "south", "worksheet": "Suivi"},
+        # Tables that were not processed are left out
+        {"sheet": "OTHER", "spreadsheet_id": "east", "worksheet": "Other"},
+    ]
+    monkeypatch.setattr(google_sheets, "st", SimpleNamespace(secrets={"publish_routes": routes}))
+    service = GoogleSheetsService()
+    monkeypatch.setattr(service, "authenticate_from_secrets", lambda: True)
+    both_running = threading.Barrier(2, timeout=5)
+    pushed = {}
+
+    def upload_all(uploads, spreadsheet_id, sync=False):
+        # Both spreadsheets are pushed at the same time, or this times out
+        both_running.wait()
+        pushed[spreadsheet_id] = {title: len(dataframe) for title, dataframe in uploads.items()}
+        return False if spreadsheet_id == "south" else f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
+
+    monkeypatch.setattr(service, "upload_all_to_google_sheets", upload_all)
+    progress = []
+    tables = {"AGADIR": pd.DataFrame({"RAF": [1, 2]}), "QUALI NV": pd.DataFrame({"RAF TSM": [3]})}
+    results = service.publish_to_google_sheets(tables, progress=lambda percent, stage: progress.append(percent))
+
+    assert pushed == {"north": {"Suivi": 2, "Quali": 1}, "south": {"Suivi": 2}}
+    assert set(results) == {"north", "south"}
+    assert results["north"]["worksheets"] == ["Suivi", "Quali"]
+    assert results["north"]["url"] == "https://docs.google.com/spreadsheets/d/north"
+    assert results["south"] == {"worksheets": ["Suivi"], "url": False, "seconds": results["south"]["seconds"]}
+    assert all(isinstance(result["seconds"], float) for result in results.values())
+    assert progress == [50, 100]
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
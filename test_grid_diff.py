@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental Google Sheets sync diff and upload chunks
+"""
+
+from google_sheets import chunk_requests, grid_diff
+
+
+def test_unchanged_grid_has_no_ranges():
+    grid = [["Vendeur", "RAF"], ["A", 10], ["B", 20]]
+    assert grid_diff(grid, [row[:] for row in grid]) == []
+
+
+def test_changed_column_is_one_range():
+    old = [["Vendeur", "RAF", "OBJ"], ["A", 10, 1], ["B", 20, 2], ["C", 30, 3]]
+    new = [["Vendeur", "RAF", "OBJ"], ["A", 11, 1], ["B", 21, 2], ["C", 31, 3]]
+    assert grid_diff(old, new) == [("B2:B4", [[11], [21], [31]])]
+
+
+def test_shrinking_grid_clears_the_tail():
+    old = [["Vendeur"], ["A"], ["B"]]
+    new = [["Vendeur"], ["A"]]
+    assert grid_diff(old, new) == [("A3:A3", [[""]])]
+
+
+def test_sheet_values_compare_like_uploaded_values():
+    # Sheets returns 20.0 as 20 and leaves trailing empty cells out
+    old = [["A", 20]]
+    new = [["A", 20.0, ""]]
+    assert grid_diff(old, new) == []
+
+
+def test_large_blocks_are_split_into_row_chunks():
+    values = [[row, row * 2] for row in range(250)]
+    chunks = chunk_requests([("Suivi Test", 1, 1, values), ("quali", 3, 2, [["x"]])], max_cells=200)
+    assert [[entry["range"] for entry in chunk] for chunk in chunks] == [
+        ["'Suivi Test'!A1"], ["'Suivi Test'!A101"], ["'Suivi Test'!A201", "'quali'!B3"],
+    ]
+    assert sum(len(entry["values"]) for chunk in chunks for entry in chunk) == 251
+
+
+if __name__ == "__main__":
+    test_unchanged_grid_has_no_ranges()
+    test_changed_column_is_one_range()
+    test_shrinking_grid_clears_the_tail()
+    test_sheet_values_compare_like_uploaded_values()
+    test_large_blocks_are_split_into_row_chunks()
+    print("✅ grid diff tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite history store
+"""
+
+import pandas as pd
+
+from history import HistoryStore, sql_name
+
+
+def agadir(real):
+    return pd.DataFrame({
+        "Vendeur": ["A", "A", "B"],
+        "Famille": ["MGM", "C.A (ht)", "MGM"],
+        "REAL": pd.Series([real, real * 2, "%"], dtype=object),
+        "RAF": [1.5, 3.0, 2.0],
+    })
+
+
+def test_sql_names():
+    assert sql_name("H %") == "h_percent"
+    assert sql_name("Moy L/BL") == "moy_l_bl"
+    assert sql_name("REAL 2025") == "real_2025"
+
+
+def test_deltas_against_previous_snapshot(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite"))
+    history.record({"AGADIR": agadir(100)}, date="2026-10-16")
+    history.record({"AGADIR": agadir(120)}, date="2026-10-17")
+    # Recording the same day again replaces that snapshot
+    history.record({"AGADIR": agadir(130)}, date="2026-10-17")
+    assert history.dates() == ["2026-10-16", "2026-10-17"]
+
+    deltas = history.deltas("REAL")
+    assert deltas["delta"].tolist()[:2] == [30.0, 60.0]
+    # "%" cells are not figures
+    assert pd.isna(deltas["current"][2])
+
+
+def test_trend_by_vendor_and_family(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite"))
+    history.record({"AGADIR": agadir(100)}, date="2026-10-16")
+    history.record({"AGADIR": agadir(120)}, date="2026-10-17")
+    trend = history.trend("REAL", vendeur="A", famille="MGM")
+    assert trend["REAL"].tolist() == [100.0, 120.0]
+
+
+def test_renamed_quali_headers_are_matched_by_position(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite"))
+    # The source header cells of QUALI NV can be empty or named differently
+    quali = pd.DataFrame([["A", 12, 3, 4.5, 5, 6, 7, 8, 9]],
+                         columns=["Vendeur", None, "ACM", "Moy", "Obj", "LINE", "TSM", "RAF TSM", "RAF ACM"])
+    history.record({"QUALI NV": quali}, date="2026-10-17", source="agadir")
+    snapshot = history.snapshot(table="QUALI NV", source="agadir")
+    assert snapshot[["CLT PROGRAMME", "Moy L/BL", "Obj L/BL"]].values.tolist() == [[12.0, 4.5, 5.0]]
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_sql_names()
+    test_deltas_against_previous_snapshot(Path(tempfile.mkdtemp()))
+    test_trend_by_vendor_and_family(Path(tempfile.mkdtemp()))
+    test_renamed_quali_headers_are_matched_by_position(Path(tempfile.mkdtemp()))
+    print("✅ history tests passed")
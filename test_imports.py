@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Test script checking the processing modules load without the UI and cloud libraries
+"""
+
+import os
+import subprocess
+import sys
+
+
+def test_core_modules_skip_streamlit_and_google():
+    check = (
+        "import sys, excel, batch, benchmark, history, server; "
+        "loaded = [name for name in ('streamlit', 'gspread', 'google.auth') if name in sys.modules]; "
+        "print(','.join(loaded))"
+    )
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == ""
+
+
+if __name__ == "__main__":
+    test_core_modules_skip_streamlit_and_google()
+    print("✅ import tests passed")
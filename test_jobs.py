@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job queue
+"""
+
+import time
+
+from jobs import JobQueue
+
+
+def wait(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while not queue.get(job_id).done and time.time() < deadline:
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_job_reports_progress_and_result():
+    queue = JobQueue(max_workers=1)
+
+    def task(job, value):
+        job.report(50, "Halfway")
+        return value * 2
+
+    job = wait(queue, queue.submit("double", task, 21))
+    assert job.status == "done"
+    assert job.result == 42
+    assert (job.progress, job.stage) == (100, "Done")
+    queue.shutdown()
+
+
+def test_failed_job_keeps_its_error():
+    queue = JobQueue(max_workers=1)
+    job = wait(queue, queue.submit("broken", lambda job: 1 / 0))
+    assert job.status == "failed"
+    assert job.error.startswith("ZeroDivisionError")
+    queue.shutdown()
+
+
+def test_oldest_finished_jobs_are_forgotten():
+    queue = JobQueue(max_workers=1, keep=2)
+    job_ids = [queue.submit(f"job {number}", lambda job: None) for number in range(4)]
+    queue.shutdown()
+    assert [queue.get(job_id) is not None for job_id in job_ids] == [False, False, True, True]
+
+
+if __name__ == "__main__":
+    test_job_reports_progress_and_result()
+    test_failed_job_keeps_its_error()
+    test_oldest_finished_jobs_are_forgotten()
+    print("✅ job queue tests passed")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the AGADIR and QUALI NV sheet layouts
+"""
+
+from openpyxl.utils import column_index_from_string
+
+from benchmark import make_workbook
+from calculations import AGADIR_COLUMNS
+from layout import AGADIR_LAYOUT, QUALI_LAYOUT
+from readers import open_workbook
+
+
+def source_rows(path, sheet):
+    workbook = open_workbook(path, "openpyxl")
+    rows = list(workbook[sheet].iter_rows(values_only=True))
+    workbook.close()
+    return rows
+
+
+def project(row, columns):
+    indexes = [column_index_from_string(column) - 1 for column in columns]
+    return [row[i] if i < len(row) else None for i in indexes]
+
+
+def test_agadir_layout_keeps_the_three_data_ranges(tmp_path):
+    # 25 vendors x 8 families fill 42-193, 202-217 and part of 232-
+    path = make_workbook(str(tmp_path / "source.xlsx"), vendors=25, extra_sheets=0)
+    rows = source_rows(path, "AGADIR")
+    table = AGADIR_LAYOUT.apply(rows)
+
+    assert table[0] == AGADIR_COLUMNS
+    assert len(table) == 1 + 25 * 8
+    expected = [project(rows[number - 1], AGADIR_LAYOUT.columns)
+                for number in list(range(42, 194)) + list(range(202, 218)) + list(range(232, 232 + 32))]
+    assert table[1:] == expected
+    # The header block and the subtotal rows between the ranges are skipped
+    assert not {"junk", "TOTAL", "TOTAL2"} & {row[0] for row in table[1:]}
+    assert table[1][:2] == ["V00 VENDOR", "LEVURE"] and table[-1][:2] == ["V24 VENDOR", "C.A (ht)"]
+
+
+def test_quali_layout_skips_the_subtotal_and_the_total_row(tmp_path):
+    path = make_workbook(str(tmp_path / "source.xlsx"), vendors=2, quali_rows=25, extra_sheets=0)
+    rows = source_rows(path, "QUALI NV")
+    table = QUALI_LAYOUT.apply(rows)
+
+    # LINE replaces the "%" header, the source headers are kept where the layout has None
+    assert table[0] == ["Vendeur", "CLT PROGRAMME", "ACM", "Moy L/BL", "Obj L/BL", "LINE", "TSM", "RAF TSM", "RAF ACM"]
+    # Reps sit on rows 13-20 and 22-38, VIDE TOTAL on 21, TOTAL on 39 and FOOT on 40:
+    # the subtotal is skipped and the row just above the last one is dropped
+    kept = list(range(13, 21)) + list(range(22, 39)) + [40]
+    assert len(table) == 1 + len(kept)
+    vendors = [row[0] for row in table[1:]]
+    assert "VIDE TOTAL" not in vendors and "TOTAL" not in vendors and vendors[-1] == "FOOT"
+    # A10 and A21 are fixed names, the other cells are the projected source rows
+    assert table[9][0] == "BOUTMEZGUINE EL MOSTAFA" and table[20][0] == "CHAKIB ELFIL"
+    for position, number in enumerate(kept, start=1):
+        expected = project(rows[number - 1], QUALI_LAYOUT.columns)
+        if position in (9, 20):
+            expected[0] = table[position][0]
+        assert table[position] == expected
+
+
+def test_short_quali_sheet_leaves_out_missing_fixed_cells():
+    header = [None] * 31
+    rows = [()] * 7 + [tuple(header)] + [()] * 4 + [(None, None, None, "R1"), (None, None, None, "R2")]
+    table = QUALI_LAYOUT.apply(rows)
+    # R2 is the last row, so the row above it (R1) is dropped; A10/A21 are out of range
+    assert [row[0] for row in table[1:]] == ["R2"]
+    assert table[0][1] is None
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_agadir_layout_keeps_the_three_data_ranges(Path(tempfile.mkdtemp()))
+    test_quali_layout_skips_the_subtotal_and_the_total_row(Path(tempfile.mkdtemp()))
+    test_short_quali_sheet_leaves_out_missing_fixed_cells()
+    print("✅ layout tests passed")
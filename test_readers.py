@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the source workbook readers
+"""
+
+import datetime
+import os
+import tempfile
+
+from openpyxl import Workbook
+
+from cache import file_digest
+from readers import open_workbook, read_metadata
+
+
+def make_source(path):
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = "AGADIR"
+    sheet["C6"] = "8/ 24 jours"
+    sheet["A8"] = 42
+    sheet["B8"] = 2.5
+    sheet["C8"] = "  padded text "
+    sheet["D8"] = True
+    sheet["E8"] = datetime.datetime(2024, 3, 1, 8, 30)
+    sheet["F8"] = datetime.date(2024, 3, 2)
+    sheet["G8"] = "=SUM(A8:B8)"
+    sheet["H8"] = "%"
+    sheet["A12"] = -1e-7
+    sheet["T15"] = 10 ** 12
+    wb.create_sheet("QUALI NV")["D13"] = "REP"
+    wb.save(path)
+
+
+def test_xml_engine_matches_openpyxl():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "source.xlsx")
+        make_source(path)
+        expected = open_workbook(path, "openpyxl")
+        with open(path, "rb") as source:
+            actual = open_workbook(source, "xml")
+            assert actual.sheetnames == expected.sheetnames
+            for name in expected.sheetnames:
+                expected_rows = list(expected[name].iter_rows(values_only=True))
+                actual_rows = list(actual[name].iter_rows(values_only=True))
+                assert actual_rows == expected_rows
+                assert [[type(value) for value in row] for row in actual_rows] == \
+                       [[type(value) for value in row] for row in expected_rows]
+            day_work = next(actual["AGADIR"].iter_rows(min_row=6, max_row=6, min_col=3, max_col=3))
+            assert day_work == ("8/ 24 jours",)
+            actual.close()
+        expected.close()
+
+
+def test_read_metadata_probes_c6_and_dimensions():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "source.xlsx")
+        make_source(path)
+        metadata = read_metadata(path, "AGADIR", ("C6", "A8", "Z99"))
+    assert metadata["sheetnames"] == ["AGADIR", "QUALI NV"]
+    assert metadata["dimensions"] == {"AGADIR": "A6:T15", "QUALI NV": "D13:D13"}
+    assert metadata["cells"] == {"C6": "8/ 24 jours", "A8": 42, "Z99": None}
+
+
+def test_uploads_are_read_in_place():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "source.xlsx")
+        make_source(path)
+        with open(path, "rb") as source:
+            data = source.read()
+        workbook = open_workbook(path, "openpyxl")
+        expected = list(workbook["AGADIR"].iter_rows(values_only=True))
+        workbook.close()
+        assert file_digest(memoryview(data)) == file_digest(path)
+    for engine in ("openpyxl", "xml"):
+        workbook = open_workbook(memoryview(data), engine)
+        assert list(workbook["AGADIR"].iter_rows(values_only=True)) == expected
+        workbook.close()
+    assert read_metadata(bytearray(data))["cells"]["C6"] == "8/ 24 jours"
+
+
+if __name__ == "__main__":
+    test_xml_engine_matches_openpyxl()
+    test_read_metadata_probes_c6_and_dimensions()
+    test_uploads_are_read_in_place()
+    print("✅ reader tests passed")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the upload result cache
+"""
+
+from benchmark import make_workbook
+from cache import ResultCache, file_digest
+from excel import Excel
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get(("a",)) == 1
+    cache.put(("c",), 3)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1
+    assert cache.get(("c",)) == 3
+    assert len(cache) == 2
+
+
+def test_byte_bound_eviction():
+    cache = ResultCache(max_bytes=2500)
+    cache.put(("a",), b"x" * 1000)
+    cache.put(("b",), b"x" * 1000)
+    cache.put(("c",), b"x" * 1000)
+    assert cache.get(("a",)) is None
+    assert len(cache) == 2 and cache.size == 2000
+    # An entry larger than the bound is still kept on its own
+    cache.put(("d",), b"x" * 5000)
+    assert len(cache) == 1 and cache.size == 5000
+
+
+def test_hits_share_the_export_but_not_the_tables(tmp_path):
+    path = tmp_path / "source.xlsx"
+    make_workbook(str(path), vendors=2, extra_sheets=0)
+    cache = ResultCache()
+
+    def process():
+        processor = Excel(str(path), read_only=True, cache=cache, output_path=None)
+        processor.get_day_work()
+        processor.fix_sheet(jour_rest=16)
+        return processor
+
+    first = process()
+    output = first.output
+    first.agadir.loc[0, "Vendeur"] = "EDITED"
+    second = process()
+    # The export of the first run is reused, its in-place edit is not
+    assert second._output is output
+    assert second.agadir.loc[0, "Vendeur"] != "EDITED"
+
+
+def test_file_digest_depends_on_content(tmp_path):
+    first = tmp_path / "first.xlsx"
+    second = tmp_path / "second.xlsx"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    assert file_digest(first) == file_digest(second)
+    second.write_bytes(b"other bytes")
+    assert file_digest(first) != file_digest(second)
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_lru_eviction()
+    test_byte_bound_eviction()
+    test_hits_share_the_export_but_not_the_tables(Path(tempfile.mkdtemp()))
+    print("✅ Result cache tests passed!")
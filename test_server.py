@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless HTTP conversion service
+"""
+
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmark import make_workbook
+from server import make_server
+
+
+def request(url, data=None, method=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method)) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_upload_process_and_fetch_results():
+    server = make_server(port=0, workers=1, queue=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as source:
+            make_workbook(source.name, vendors=3, extra_sheets=0)
+            data = source.read()
+
+        status, headers, body = request(f"{base}/jobs?rest_days=16", data)
+        assert status == 202
+        job_id = json.loads(body)["id"]
+        assert headers["Location"] == f"/jobs/{job_id}"
+
+        deadline = time.time() + 30
+        while json.loads(request(f"{base}/jobs/{job_id}")[2])["status"] not in ("done", "failed"):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        job = json.loads(request(f"{base}/jobs/{job_id}")[2])
+        assert (job["status"], job["work_days"], job["rest_days"]) == ("done", 8, 16)
+        assert job["rows"] == {"AGADIR": 24, "QUALI NV": 4}
+
+        tables = json.loads(request(f"{base}/jobs/{job_id}/result")[2])
+        assert len(tables["AGADIR"]) == 24 and tables["AGADIR"][0]["Vendeur"] == "V00 VENDOR"
+        status, headers, body = request(f"{base}/jobs/{job_id}/result?format=csv&sheet=QUALI%20NV")
+        assert status == 200 and body.decode().startswith("Vendeur,")
+        status, headers, body = request(f"{base}/jobs/{job_id}/result?format=xlsx")
+        assert status == 200 and body[:2] == b"PK"
+        assert request(f"{base}/jobs/{job_id}/result?format=xml")[0] == 400
+
+        assert request(f"{base}/jobs/{job_id}", method="DELETE")[0] == 200
+        assert request(f"{base}/jobs/{job_id}")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.jobs.shutdown()
+
+
+def test_full_queue_is_refused():
+    server = make_server(port=0, workers=1, queue=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    release = threading.Event()
+    server.service.jobs.submit("busy", lambda job: release.wait(5))
+    try:
+        status, headers, _ = request(f"{base}/jobs", b"not a workbook")
+        assert status == 503 and headers["Retry-After"] == "5"
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        server.service.jobs.shutdown()
+
+
+def test_deleting_a_queued_job_keeps_its_capacity():
+    server = make_server(port=0, workers=1, queue=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    release = threading.Event()
+    server.service.jobs.submit("busy", lambda job: release.wait(5))
+    try:
+        status, _, body = request(f"{base}/jobs", b"not a workbook")
+        assert status == 202
+        job_id = json.loads(body)["id"]
+        assert request(f"{base}/jobs/{job_id}", method="DELETE")[0] == 409
+        # Even once forgotten, the queued work item still holds its place
+        server.service.jobs.forget(job_id)
+        assert server.service.jobs.pending() == 2
+        assert request(f"{base}/jobs", b"not a workbook")[0] == 503
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        server.service.jobs.shutdown()
+    assert server.service.jobs.pending() == 0
+
+
+if __name__ == "__main__":
+    test_upload_process_and_fetch_results()
+    test_full_queue_is_refused()
+    test_deleting_a_queued_job_keeps_its_capacity()
+    print("✅ server tests passed")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for the processed table store
+"""
+
+import pandas as pd
+
+from table_store import load_table, load_tables, save_tables, tables_dir_for
+
+
+def test_mixed_columns_round_trip(tmp_path):
+    # AGADIR columns mix counts with "%" marker cells
+    agadir = pd.DataFrame({
+        "Vendeur": ["A", "B", None],
+        "REAL": pd.Series([7538, "%", 12.5], dtype=object),
+        "RAF": [1.5, 2.0, float("nan")],
+    })
+    save_tables(tmp_path, {"AGADIR": agadir})
+    loaded = load_table(tmp_path, "AGADIR")
+    assert list(loaded.columns) == ["Vendeur", "REAL", "RAF"]
+    assert list(loaded["REAL"]) == [7538, "%", 12.5]
+    assert type(loaded["REAL"][0]) is int
+    assert loaded["RAF"][:2].tolist() == [1.5, 2.0]
+
+
+def test_empty_and_repeated_headers_are_kept(tmp_path):
+    # QUALI NV keeps some source header cells, which can be empty or repeated
+    quali = pd.DataFrame([["A", 1, 2, 3]], columns=["Vendeur", None, "OBJ", "OBJ"])
+    save_tables(tmp_path, {"QUALI NV": quali})
+    loaded = load_table(tmp_path, "QUALI NV")
+    assert loaded.columns.equals(quali.columns)
+    assert loaded.values.tolist() == [["A", 1, 2, 3]]
+
+    # Saving clean names again replaces the earlier file
+    save_tables(tmp_path, {"QUALI NV": pd.DataFrame({"Vendeur": ["B"]})})
+    assert list(load_table(tmp_path, "QUALI NV")["Vendeur"]) == ["B"]
+
+
+def test_missing_tables_are_skipped(tmp_path):
+    assert load_table(tmp_path, "QUALI NV") is None
+    assert load_tables(tmp_path) == {}
+
+
+def test_tables_sit_next_to_the_output():
+    assert tables_dir_for("excel/finale_jour.xlsx") == "excel/finale_jour_tables"
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_mixed_columns_round_trip(Path(tempfile.mkdtemp()))
+    test_empty_and_repeated_headers_are_kept(Path(tempfile.mkdtemp()))
+    test_missing_tables_are_skipped(Path(tempfile.mkdtemp()))
+    test_tables_sit_next_to_the_output()
+    print("✅ table store tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the stage timing spans
+"""
+
+import json
+import os
+import tempfile
+
+import timing
+from timing import span
+
+
+def test_span_records_fields_rows_and_errors():
+    timing.reset()
+    with span("reshape", sheet="AGADIR") as record:
+        record["rows"] = 168
+    try:
+        with span("compute"):
+            raise ValueError("bad cell")
+    except ValueError:
+        pass
+    reshape, compute = timing.recent()
+    assert (reshape["span"], reshape["sheet"], reshape["rows"], reshape["status"]) == ("reshape", "AGADIR", 168, "ok")
+    assert reshape["seconds"] >= 0
+    assert compute["status"] == "error"
+
+
+def test_sinks_write_json_lines_and_prometheus_totals():
+    timing.reset()
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "timings.jsonl")
+        prometheus_path = os.path.join(directory, "timings.prom")
+        timing.configure(json_path=json_path, prometheus_path=prometheus_path)
+        try:
+            for _ in range(2):
+                with span("update", sheet="QUALI NV", rows=31):
+                    pass
+
+            @span("fix_sheet")
+            def fix_sheet():
+                return True
+
+            assert fix_sheet()
+        finally:
+            timing.configure(json_path="", prometheus_path="")
+        with open(json_path) as json_file:
+            records = [json.loads(line) for line in json_file]
+        with open(prometheus_path) as prometheus_file:
+            metrics = prometheus_file.read()
+    assert [record["span"] for record in records] == ["update", "update", "fix_sheet"]
+    assert 'excel_converter_span_seconds_count{span="update",sheet="QUALI NV"} 2' in metrics
+    assert 'excel_converter_span_rows{span="update",sheet="QUALI NV"} 31' in metrics
+    assert 'excel_converter_span_errors_total{span="fix_sheet"} 0' in metrics
+
+
+if __name__ == "__main__":
+    test_span_records_fields_rows_and_errors()
+    test_sinks_write_json_lines_and_prometheus_totals()
+    print("✅ timing tests passed")
@@ -0,0 +1,178 @@
+"""
+Stage timings for the Excel pipeline and the Google Sheets uploads.
+
+Wrap a stage in span() and every run of it emits a record with its time, status
+and any fields given, e.g. rows. Where the records go is set with configure()
+or the environment:
+
+    EXCEL_TIMINGS_JSON=timings.jsonl      one JSON record per line
+    EXCEL_TIMINGS_PROM=timings.prom       Prometheus text file, rewritten after each span
+    EXCEL_TIMINGS_ECHO=1                  print every span
+    EXCEL_PROFILE=cprofile|tracemalloc    profile the outermost spans
+    EXCEL_PROFILE_DIR=profiles            where the cProfile .prof files go
+"""
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+
+_settings = {
+    "json_path": os.environ.get("EXCEL_TIMINGS_JSON"),
+    "prometheus_path": os.environ.get("EXCEL_TIMINGS_PROM"),
+    "echo": os.environ.get("EXCEL_TIMINGS_ECHO", "") not in ("", "0"),
+    "profile": os.environ.get("EXCEL_PROFILE"),
+    "profile_dir": os.environ.get("EXCEL_PROFILE_DIR", "profiles"),
+}
+_lock = threading.Lock()
+_local = threading.local()
+# Last records, for a quick look without any sink configured
+_recent = deque(maxlen=500)
+# (span, sheet) -> running totals for the Prometheus file
+_totals = {}
+
+
+def configure(json_path=None, prometheus_path=None, echo=None, profile=None, profile_dir=None):
+    """Change where records go; arguments left to None keep their current value"""
+    for name, value in [("json_path", json_path), ("prometheus_path", prometheus_path), ("echo", echo),
+                        ("profile", profile), ("profile_dir", profile_dir)]:
+        if value is not None:
+            _settings[name] = value
+
+
+def recent() -> list:
+    """return the last records, oldest first"""
+    with _lock:
+        return list(_recent)
+
+
+def reset():
+    """Forget the recent records and the Prometheus totals"""
+    with _lock:
+        _recent.clear()
+        _totals.clear()
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time the block as the stage name. The record is yielded so the block can
+    add fields (record["rows"] = ...) and is emitted when the block ends, with
+    status "error" when it raised. Also works as a function decorator.
+    """
+    record = {"span": name, **fields, "status": "ok"}
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    profile = _start_profile() if depth == 0 else None
+    memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "error"
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        _local.depth = depth
+        if memory is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_mb"] = round((current - memory) / 1e6, 3)
+            if depth == 0:
+                record["peak_mb"] = round((peak - memory) / 1e6, 3)
+        if profile is not None:
+            _stop_profile(profile, record)
+        _emit(record)
+
+
+def _start_profile():
+    mode = _settings["profile"]
+    if mode == "tracemalloc":
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return ("tracemalloc", started)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another thread is already profiling its own span
+            return None
+        return ("cprofile", profiler)
+    return None
+
+
+def _stop_profile(profile, record):
+    mode, state = profile
+    if mode == "tracemalloc":
+        if state:
+            tracemalloc.stop()
+        return
+    state.disable()
+    os.makedirs(_settings["profile_dir"], exist_ok=True)
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", record["span"]).strip("_")
+    path = os.path.join(_settings["profile_dir"], f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{id(state):x}.prof")
+    state.dump_stats(path)
+    record["profile"] = path
+
+
+def _emit(record):
+    record["time"] = round(time.time(), 3)
+    with _lock:
+        _recent.append(record)
+        totals = _totals.setdefault((record["span"], record.get("sheet")), {"count": 0, "seconds": 0.0, "errors": 0})
+        totals["count"] += 1
+        totals["seconds"] += record["seconds"]
+        totals["errors"] += record["status"] == "error"
+        if "rows" in record:
+            totals["rows"] = record["rows"]
+        if _settings["json_path"]:
+            with open(_settings["json_path"], "a") as json_file:
+                json_file.write(json.dumps(record, default=str) + "\n")
+        if _settings["prometheus_path"]:
+            _write_prometheus(_settings["prometheus_path"])
+    if _settings["echo"]:
+        extras = " ".join(f"{key}={value}" for key, value in record.items()
+                          if key not in ("span", "seconds", "status", "time"))
+        print(f"⏱️ {record['span']} {record['seconds']:.3f}s {record['status']} {extras}".rstrip())
+
+
+def _labels(name, sheet):
+    labels = f'span="{name}"'
+    if sheet:
+        labels += f',sheet="{sheet}"'
+    return "{" + labels + "}"
+
+
+def _write_prometheus(path):
+    lines = [
+        "# HELP excel_converter_span_seconds Time spent in each stage",
+        "# TYPE excel_converter_span_seconds summary",
+    ]
+    for (name, sheet), totals in sorted(_totals.items(), key=str):
+        lines.append(f"excel_converter_span_seconds_sum{_labels(name, sheet)} {totals['seconds']:.6f}")
+        lines.append(f"excel_converter_span_seconds_count{_labels(name, sheet)} {totals['count']}")
+    lines += [
+        "# HELP excel_converter_span_errors_total Runs of each stage that raised",
+        "# TYPE excel_converter_span_errors_total counter",
+    ]
+    for (name, sheet), totals in sorted(_totals.items(), key=str):
+        lines.append(f"excel_converter_span_errors_total{_labels(name, sheet)} {totals['errors']}")
+    lines += [
+        "# HELP excel_converter_span_rows Rows handled by the last run of each stage",
+        "# TYPE excel_converter_span_rows gauge",
+    ]
+    for (name, sheet), totals in sorted(_totals.items(), key=str):
+        if "rows" in totals:
+            lines.append(f"excel_converter_span_rows{_labels(name, sheet)} {totals['rows']}")
+    # Replace the file at once so a scraper never reads half of it
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as prometheus_file:
+        prometheus_file.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)